@@ -0,0 +1,103 @@
+import numpy as np
+import backend.stats as stats
+
+WEEKLY_STATS = '''
+    SELECT s.player_id, CAST(g.year AS INTEGER), CAST(g.season_id AS INTEGER), g.week, s.{column}
+    FROM player_game_stats s
+    JOIN games g ON g.game_id = s.game_id
+    WHERE s.{column} IS NOT NULL AND g.week IS NOT NULL AND g.year IS NOT NULL AND g.season_id IS NOT NULL
+'''
+
+PLAYER_POSITIONS = 'SELECT athlete_id, MAX(position_abv) FROM athletes WHERE athlete_id IS NOT NULL GROUP BY athlete_id'
+
+
+def _factorize(labels):
+    # Sorted distinct labels and each label's position in them; a dict lookup
+    # beats np.unique's string sort by a wide margin on player ids.
+    distinct = sorted(set(labels))
+    index = {label: position for position, label in enumerate(distinct)}
+    return distinct, np.fromiter(map(index.__getitem__, labels), dtype=np.int64, count=len(labels))
+
+
+def weekly_matrix(player_ids, weeks, values):
+    # Rows are players, columns are weeks in sorted order; weeks a player has no line
+    # for are NaN. A week is any sortable label, such as (season, season_type, week),
+    # and lines that land in the same cell are added together rather than overwritten.
+    players, player_index = _factorize(player_ids)
+    week_labels, week_index = _factorize(weeks)
+
+    matrix = np.zeros((len(players), len(week_labels)))
+    np.add.at(matrix, (player_index, week_index), np.fromiter(values, dtype=float, count=len(values)))
+    played = np.zeros(matrix.shape, dtype=bool)
+    played[player_index, week_index] = True
+    matrix[~played] = np.nan
+    return np.array(players, dtype=object), np.array(week_labels, dtype=np.int64), matrix
+
+
+def load_weekly(conn, column, season=None):
+    if column not in stats.COLUMNS:
+        raise ValueError(f"Unknown stat column: {column}")
+
+    sql = WEEKLY_STATS.format(column=column)
+    params = ()
+    if season is not None:
+        sql += ' AND g.year = ?'
+        params = (str(season),)
+
+    rows = conn.execute(sql, params).fetchall()
+    if not rows:
+        return weekly_matrix([], [], [])
+
+    # Preseason, regular season and postseason all restart at week 1, so a column is
+    # a (season, season_type, week) and the columns run in calendar order.
+    player_ids, seasons, season_types, weeks, values = zip(*rows)
+    return weekly_matrix(player_ids, list(zip(seasons, season_types, weeks)), values)
+
+
+def load_positions(conn, players):
+    positions = dict(conn.execute(PLAYER_POSITIONS).fetchall())
+    return np.array([positions.get(player) or '' for player in players], dtype=object)
+
+
+def games_played(matrix):
+    return np.count_nonzero(~np.isnan(matrix), axis=1)
+
+
+def totals(matrix):
+    return np.nansum(matrix, axis=1)
+
+
+def averages(matrix):
+    played = games_played(matrix)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(played > 0, totals(matrix) / played, np.nan)
+
+
+def rolling_totals(matrix, window):
+    # Sum over each run of `window` consecutive weeks; column i covers weeks i .. i + window - 1.
+    filled = np.nan_to_num(matrix)
+    running = np.cumsum(np.pad(filled, ((0, 0), (1, 0))), axis=1)
+    return running[:, window:] - running[:, :-window]
+
+
+def rolling_averages(matrix, window):
+    played = (~np.isnan(matrix)).astype(np.int64)
+    running = np.cumsum(np.pad(played, ((0, 0), (1, 0))), axis=1)
+    counts = running[:, window:] - running[:, :-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, rolling_totals(matrix, window) / counts, np.nan)
+
+
+def position_percentiles(values, positions):
+    # Share of players at the same position with a value at or below each player's, 0-100.
+    values = np.asarray(values, dtype=float)
+    positions = np.asarray(positions, dtype=object)
+    percentiles = np.full(len(values), np.nan)
+
+    scored = ~np.isnan(values)
+    for position in set(positions[scored]):
+        members = scored & (positions == position)
+        group = values[members]
+        ranked = np.sort(group)
+        percentiles[members] = np.searchsorted(ranked, group, side='right') / len(group) * 100
+    return percentiles
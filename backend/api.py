@@ -0,0 +1,318 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
+import time
+from flask import Blueprint, Response, jsonify, request
+import backend.cadence as cadence
+import backend.config as config
+import backend.functions as functions
+import backend.queries as queries
+import backend.stats as stats
+
+# JSON over the same tables the pages read. Every response carries a strong ETag
+# built from the data_versions of what it contains, so polling clients get a 304
+# without the body being read or serialized again.
+
+blueprint = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Bump when a payload changes shape so clients do not keep an old body on a 304.
+SCHEMA = 3
+
+
+def _placeholders(values):
+    return ','.join('?' for _ in values)
+
+
+def _begin():
+    # One read transaction per request: the versions behind the ETag and the body
+    # come from the same snapshot even if the writer commits in between.
+    conn = functions.get_database(readonly=True)
+    conn.execute('BEGIN')
+    return conn
+
+
+def _etag(cursor, tags):
+    versions = {}
+    if tags:
+        cursor.execute(queries.API_VERSIONS.format(tags=_placeholders(tags)), tags)
+        versions = dict(cursor.fetchall())
+
+    key = json.dumps([SCHEMA, request.full_path, [(tag, versions.get(tag, 0)) for tag in tags]])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _not_modified(etag):
+    if etag not in request.if_none_match:
+        return None
+
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _json(payload, etag):
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _error(message, status):
+    return jsonify(error=message), status
+
+
+def encode_cursor(game_id):
+    return base64.urlsafe_b64encode(game_id.encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return ''
+    try:
+        return base64.b64decode(cursor, altchars=b'-_', validate=True).decode()
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _int(value):
+    # Several numeric fields sit in TEXT columns; the API always returns them as numbers.
+    return int(value) if value not in (None, '') else None
+
+
+def _kickoff(kickoff):
+    return cadence.iso_kickoff(kickoff) if kickoff is not None else None
+
+
+def _read_games(cursor, game_ids):
+    if not game_ids:
+        return []
+
+    cursor.execute(queries.API_GAMES.format(game_ids=_placeholders(game_ids)), game_ids)
+
+    games = {}
+    for row in cursor.fetchall():
+        game_id, name, kickoff, year, season_type, week, status, clock, period, down, last_play = row[:11]
+        team_id, team_name, abbreviation, logo, score, home_away = row[11:]
+
+        game = games.setdefault(game_id, {
+            'game_id': game_id,
+            'name': name,
+            'kickoff': _kickoff(kickoff),
+            'season': _int(year),
+            'season_type': _int(season_type),
+            'week': week,
+            'status': status,
+            'clock': clock,
+            'period': _int(period),
+            'down': down,
+            'last_play': last_play,
+            'teams': [],
+        })
+        game['teams'].append({
+            'team_id': team_id,
+            'name': team_name,
+            'abbreviation': abbreviation,
+            'logo': logo,
+            'score': score,
+            'home_away': home_away,
+        })
+    return [games[game_id] for game_id in game_ids if game_id in games]
+
+
+def _game_tags(game_ids):
+    return [f'game:{game_id}' for game_id in game_ids]
+
+
+def _games_response(game_ids):
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        etag = _etag(cursor, _game_tags(game_ids))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        return _json({'games': _read_games(cursor, game_ids)}, etag)
+    finally:
+        conn.rollback()
+
+
+@blueprint.route('/scoreboard')
+def current_scoreboard():
+    return _games_response(functions.current_game_ids())
+
+
+@blueprint.route('/scoreboard/<int:season>/<int:week>')
+def week_scoreboard(season, week):
+    season_type = request.args.get('season_type', 2, type=int)
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(queries.API_WEEK_GAME_IDS, (season, season_type, week))
+        game_ids = [row[0] for row in cursor.fetchall()]
+
+        etag = _etag(cursor, _game_tags(game_ids))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        payload = {
+            'season': season,
+            'season_type': season_type,
+            'week': week,
+            'games': _read_games(cursor, game_ids),
+        }
+        return _json(payload, etag)
+    finally:
+        conn.rollback()
+
+
+@blueprint.route('/games')
+def list_games():
+    season = request.args.get('season', type=int) or functions.current_season()
+    limit = min(max(request.args.get('limit', config.API_PAGE_SIZE, type=int), 1), config.API_MAX_PAGE_SIZE)
+    after = decode_cursor(request.args.get('cursor'))
+    if after is None:
+        return _error('Invalid cursor', 400)
+
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        # One extra row tells whether there is a next page without a COUNT(*).
+        cursor.execute(queries.API_SEASON_GAME_IDS, (season, after, limit + 1))
+        game_ids = [row[0] for row in cursor.fetchall()]
+        next_cursor = encode_cursor(game_ids[limit - 1]) if len(game_ids) > limit else None
+        game_ids = game_ids[:limit]
+
+        etag = _etag(cursor, _game_tags(game_ids))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        payload = {
+            'season': season,
+            'games': _read_games(cursor, game_ids),
+            'next_cursor': next_cursor,
+        }
+        return _json(payload, etag)
+    finally:
+        conn.rollback()
+
+
+@blueprint.route('/games/live')
+def live_games():
+    games = cadence.live_games(functions.get_database(readonly=True), time.time())
+    return _games_response([game_id for game_id, _, _ in games])
+
+
+@blueprint.route('/games/upcoming')
+def upcoming_games():
+    hours = request.args.get('hours', 24, type=float)
+    if not math.isfinite(hours):
+        return _error('Invalid hours', 400)
+    hours = min(max(hours, 0), config.API_MAX_UPCOMING_HOURS)
+    games = cadence.upcoming_games(functions.get_database(readonly=True), time.time(), hours * 3600)
+    return _games_response([game_id for game_id, _, _ in games])
+
+
+@blueprint.route('/games/<game_id>')
+def game_detail(game_id):
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        etag = _etag(cursor, _game_tags([game_id]))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        games = _read_games(cursor, [game_id])
+        if not games:
+            return _error('Game not found', 404)
+        game = games[0]
+
+        cursor.execute(queries.API_GAME_PLAYERS, (game_id,))
+        players_by_team = {}
+        for row in cursor.fetchall():
+            player_id, full_name, team_id = row[:3]
+            players_by_team.setdefault(team_id, []).append({
+                'player_id': player_id,
+                'name': full_name,
+                'stats': {column: value for column, value in zip(stats.COLUMNS, row[3:]) if value is not None},
+            })
+
+        for team in game['teams']:
+            team['players'] = players_by_team.get(team['team_id'], [])
+        return _json(game, etag)
+    finally:
+        conn.rollback()
+
+
+@blueprint.route('/teams/<team_id>/schedule')
+def team_schedule(team_id):
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        etag = _etag(cursor, [f'team:{team_id}'])
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        cursor.execute(queries.TEAM_SCHEDULE, (team_id,))
+        schedule = []
+        for row in cursor.fetchall():
+            name, week, kickoff, status, abbreviation, score, opponent_abbreviation, opponent_score, outcome = row[:9]
+            logo, opponent_logo, _, opponent_id, game_id = row[9:]
+            schedule.append({
+                'game_id': game_id,
+                'name': name,
+                'week': week,
+                'kickoff': _kickoff(kickoff),
+                'status': status,
+                'outcome': outcome,
+                'team': {'abbreviation': abbreviation, 'logo': logo, 'score': score},
+                'opponent': {'team_id': opponent_id, 'abbreviation': opponent_abbreviation, 'logo': opponent_logo, 'score': opponent_score},
+            })
+        return _json({'team_id': team_id, 'schedule': schedule}, etag)
+    finally:
+        conn.rollback()
+
+
+@blueprint.route('/teams/<team_id>/depth-chart')
+def team_depth_chart(team_id):
+    conn = _begin()
+    try:
+        cursor = conn.cursor()
+        etag = _etag(cursor, [f'team:{team_id}'])
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        cursor.execute(queries.TEAM_DEPTH_CHART, (team_id,))
+        positions = {}
+        seen = set()
+        for row in cursor.fetchall():
+            category, position, slot, rank, player_name, jersey, headshot, position_name = row[:8]
+            position_abv, slug, short_name, athlete_id, _, player_status = row[8:]
+            # Depth chart slots whose athlete has not been loaded yet have nothing to show.
+            if athlete_id is None or (position, athlete_id) in seen:
+                continue
+            seen.add((position, athlete_id))
+
+            entry = positions.setdefault((category, position), {'category': category, 'position': position, 'players': []})
+            entry['players'].append({
+                'athlete_id': athlete_id,
+                'name': player_name,
+                'short_name': short_name,
+                'slug': slug,
+                'jersey': jersey,
+                'headshot': headshot,
+                'position': position_abv,
+                'slot': _int(slot),
+                'rank': _int(rank),
+                'status': player_status,
+            })
+        return _json({'team_id': team_id, 'positions': list(positions.values())}, etag)
+    finally:
+        conn.rollback()
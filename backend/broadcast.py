@@ -0,0 +1,150 @@
+import json
+import queue
+import threading
+import backend.config as config
+import backend.functions as functions
+import backend.writer as writer
+
+# One thread reads the live slate after each ingest write and fans the changed
+# games out to every connected /stream viewer, so the database cost of an
+# update does not depend on how many viewers there are.
+
+_lock = threading.Lock()
+_changed = threading.Event()
+_thread = None
+_subscribers = set()
+_snapshot = {}
+_version = None
+
+
+def _on_commit(tags):
+    if any(tag.startswith('game:') for tag in tags):
+        _changed.set()
+
+
+def _read_games(game_ids):
+    if not game_ids:
+        return {}
+
+    placeholders = ','.join('?' for _ in game_ids)
+    cursor = functions.get_database(readonly=True).cursor()
+    cursor.execute(f'''
+        SELECT game_id, status, clock, period, down, detailed_text, home_team_id, home_score, away_team_id, away_score
+        FROM scoreboard
+        WHERE game_id IN ({placeholders})
+    ''', list(game_ids))
+
+    games = {}
+    for game_id, status, clock, period, down, detailed_text, home_team_id, home_score, away_team_id, away_score in cursor.fetchall():
+        games[game_id] = {
+            'game_id': game_id,
+            'status': status,
+            'clock': clock,
+            'period': period,
+            'down': down,
+            'last_play': detailed_text,
+            'scores': {home_team_id: home_score, away_team_id: away_score},
+        }
+    return games
+
+
+def message(games):
+    return f'event: games\ndata: {json.dumps(games)}\n\n'
+
+
+def _publish(payload):
+    with _lock:
+        subscribers = list(_subscribers)
+
+    for subscriber in subscribers:
+        try:
+            subscriber.put_nowait(payload)
+        except queue.Full:
+            # A viewer this far behind is gone or stuck; drop it rather than buffer forever.
+            unsubscribe(subscriber)
+
+
+def refresh():
+    global _version
+
+    version = functions.get_versions(['ingest'])[0]
+    games = _read_games(functions.current_game_ids())
+
+    with _lock:
+        changed = [game for game_id, game in games.items() if _snapshot.get(game_id) != game]
+        _snapshot.clear()
+        _snapshot.update(games)
+        _version = version
+
+    if changed:
+        _publish(message(changed))
+    return changed
+
+
+def _loop():
+    while True:
+        woken = _changed.wait(config.STREAM_POLL)
+        _changed.clear()
+
+        with _lock:
+            idle = not _subscribers
+        if idle:
+            continue
+
+        # Without a local commit, only read when another process has ingested something.
+        if not woken and functions.get_versions(['ingest'])[0] == _version:
+            continue
+
+        try:
+            refresh()
+        except Exception as e:
+            print(f"Live stream refresh failed: {e}")
+
+
+def start():
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name='live-broadcaster', daemon=True)
+
+    writer.add_listener(_on_commit)
+    _thread.start()
+
+
+def subscribe():
+    start()
+    subscriber = queue.Queue(maxsize=config.STREAM_QUEUE)
+    with _lock:
+        _subscribers.add(subscriber)
+        snapshot = list(_snapshot.values())
+
+    if snapshot:
+        subscriber.put_nowait(message(snapshot))
+    _changed.set()
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    with _lock:
+        _subscribers.discard(subscriber)
+
+
+def _subscribed(subscriber):
+    with _lock:
+        return subscriber in _subscribers
+
+
+def stream(subscriber):
+    try:
+        while True:
+            try:
+                payload = subscriber.get(timeout=config.STREAM_HEARTBEAT)
+            except queue.Empty:
+                payload = ': keepalive\n\n'
+            if not _subscribed(subscriber):
+                return
+            yield payload
+    finally:
+        unsubscribe(subscriber)
@@ -0,0 +1,108 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+import backend.config as config
+import backend.queries as queries
+
+FINAL_STATUSES = ('Canceled', 'Postponed', 'Forfeit')
+BREAK_STATUSES = ('Halftime', 'End of Period')
+DISPLAY_TIMEZONE = ZoneInfo('America/New_York')
+
+
+def parse_kickoff(date):
+    # ESPN sends UTC ISO times; rows stored before kickoff was its own column hold the display format.
+    if not date:
+        return None
+
+    try:
+        kickoff = datetime.strptime(date, '%m/%d/%Y @ %I:%M %p').replace(tzinfo=DISPLAY_TIMEZONE)
+    except ValueError:
+        try:
+            kickoff = datetime.strptime(date.replace('Z', '+0000'), '%Y-%m-%dT%H:%M%z')
+        except ValueError:
+            return None
+
+    return int(kickoff.timestamp())
+
+
+def iso_kickoff(kickoff):
+    return datetime.fromtimestamp(kickoff, timezone.utc).strftime('%Y-%m-%dT%H:%MZ')
+
+
+def format_kickoff(kickoff):
+    if kickoff is None:
+        return ''
+    return datetime.fromtimestamp(kickoff, DISPLAY_TIMEZONE).strftime('%m/%d/%Y @ %I:%M %p')
+
+
+def game_state(status, clock):
+    if not status or status == 'Scheduled':
+        return 'scheduled'
+    if status.startswith('Final') or status in FINAL_STATUSES:
+        return 'final'
+    if status in BREAK_STATUSES or clock == '0:00':
+        return 'break'
+    return 'live'
+
+
+def load_games(conn, game_ids):
+    if not game_ids:
+        return []
+
+    placeholders = ','.join('?' for _ in game_ids)
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT game_id, status, clock, kickoff FROM games WHERE game_id IN ({placeholders})', list(game_ids))
+    return [(game_id, game_state(status, clock), kickoff) for game_id, status, clock, kickoff in cursor.fetchall()]
+
+
+def _games_between(conn, start, end):
+    cursor = conn.cursor()
+    cursor.execute(queries.GAMES_BETWEEN, (int(start), int(end)))
+    return [(game_id, game_state(status, clock), kickoff) for game_id, status, clock, kickoff in cursor.fetchall()]
+
+
+def upcoming_games(conn, now, seconds):
+    return [game for game in _games_between(conn, now, now + seconds) if game[1] == 'scheduled']
+
+
+def live_games(conn, now):
+    # No game runs longer than LIVE_WINDOW, so only kickoffs inside it need their status checked.
+    return [game for game in _games_between(conn, now - config.LIVE_WINDOW, now) if game[1] in ('live', 'break')]
+
+
+def plan_scoreboard(games, now):
+    # Nothing on the slate (offseason, bye week): there is no game to watch for, so check back rarely.
+    if not games:
+        return config.POLL_IDLE
+
+    states = [state for _, state, _ in games]
+
+    if 'live' in states:
+        return config.POLL_LIVE
+    if 'break' in states:
+        return config.POLL_BREAK
+
+    kickoffs = [kickoff for _, state, kickoff in games if state == 'scheduled' and kickoff]
+    if not kickoffs:
+        if all(state == 'final' for state in states):
+            return None
+        return config.POLL_PREGAME
+
+    next_kickoff = min(kickoffs)
+    if now >= next_kickoff:
+        return config.POLL_LIVE
+
+    window_opens = next_kickoff - config.PREGAME_WINDOW
+    if now >= window_opens:
+        return config.POLL_PREGAME
+
+    return max(config.POLL_PREGAME, min(config.POLL_IDLE, window_opens - now))
+
+
+def plan_boxscores(games, finished):
+    due = []
+    for game_id, state, _ in games:
+        if state in ('live', 'break'):
+            due.append(game_id)
+        elif state == 'final' and game_id not in finished:
+            due.append(game_id)
+    return due
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+from urllib.parse import urlsplit
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import backend.config as config
+import backend.fixtures as fixtures
+import backend.metrics as metrics
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def _build_session():
+    retry = Retry(
+        total=config.HTTP_RETRIES,
+        backoff_factor=config.HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=('GET',),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_HOSTS,
+        pool_maxsize=config.HTTP_POOL_PER_HOST,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def _conditional_headers(url):
+    with _validators_lock:
+        validators = _validators.get(url, {})
+
+    headers = {}
+    if 'etag' in validators:
+        headers['If-None-Match'] = validators['etag']
+    if 'last_modified' in validators:
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def _remember_validators(url, headers):
+    validators = {}
+    if headers.get('ETag'):
+        validators['etag'] = headers['ETag']
+    if headers.get('Last-Modified'):
+        validators['last_modified'] = headers['Last-Modified']
+
+    with _validators_lock:
+        if validators:
+            _validators[url] = validators
+        else:
+            _validators.pop(url, None)
+
+
+def forget(url):
+    with _validators_lock:
+        _validators.pop(url, None)
+
+
+def upstream_url(url):
+    # With UPSTREAM_OVERRIDE set, https://host/path?query becomes <override>/host/path?query.
+    if not config.UPSTREAM_OVERRIDE:
+        return url
+
+    parts = urlsplit(url)
+    rewritten = f"{config.UPSTREAM_OVERRIDE.rstrip('/')}/{parts.netloc}{parts.path}"
+    return f'{rewritten}?{parts.query}' if parts.query else rewritten
+
+
+def get(url, conditional=True, stream=False):
+    # With stream=True the body is left unread for iter_content, and recording it is up to the caller.
+    headers = _conditional_headers(url) if conditional else {}
+
+    with metrics.span('fantasy_upstream_request_seconds', host=urlsplit(url).netloc):
+        response = get_session().get(
+            upstream_url(url),
+            headers=headers,
+            timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT),
+            stream=stream,
+        )
+
+    if response.status_code == 200:
+        if conditional:
+            _remember_validators(url, response.headers)
+        if config.UPSTREAM_RECORD and not stream:
+            fixtures.save(config.UPSTREAM_RECORD, url, response.content)
+    return response
+
+
+def async_session():
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_HOSTS * config.HTTP_POOL_PER_HOST,
+        limit_per_host=config.HTTP_POOL_PER_HOST,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(
+        sock_connect=config.HTTP_CONNECT_TIMEOUT,
+        sock_read=config.HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+async def fetch_json_async(session, url, conditional=True):
+    headers = _conditional_headers(url) if conditional else {}
+    host = urlsplit(url).netloc
+
+    for attempt in range(config.HTTP_RETRIES + 1):
+        delay = config.HTTP_BACKOFF * (2 ** attempt)
+        try:
+            with metrics.span('fantasy_upstream_request_seconds', host=host):
+                async with session.get(upstream_url(url), headers=headers) as response:
+                    status = response.status
+                    response_headers = response.headers
+                    body = await response.read() if status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == config.HTTP_RETRIES:
+                raise
+            await asyncio.sleep(delay)
+            continue
+
+        if status == 304:
+            return status, None
+
+        if status in RETRY_STATUSES and attempt < config.HTTP_RETRIES:
+            await asyncio.sleep(delay)
+            continue
+
+        if status != 200:
+            print(f"Request to {url} failed with status {status}")
+            return status, None
+
+        data = json.loads(body)
+        if config.UPSTREAM_RECORD:
+            fixtures.save(config.UPSTREAM_RECORD, url, body)
+        if conditional:
+            _remember_validators(url, response_headers)
+        return status, data
+
+
+async def get_json_async(session, url, conditional=True):
+    _, data = await fetch_json_async(session, url, conditional)
+    return data
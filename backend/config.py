@@ -1,8 +1,85 @@
+import os
+
 # API URLS
 API_FOR_DEPTH = 'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/seasons/2021/teams/24/depthcharts'
 API_URL_PLAYERS = 'https://api.sleeper.app/v1/players/nfl'
 API_URL_WEEK =  "https://api.sleeper.app/v1/state/nfl"
 API_URL_ESPN = "https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard"
 
+#HTTP client
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 15
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.5
+HTTP_POOL_HOSTS = 8
+HTTP_POOL_PER_HOST = 10
+#Send every upstream request to a fixture replay server, or save every response under a directory
+UPSTREAM_OVERRIDE = os.environ.get('FANTASY_UPSTREAM')
+UPSTREAM_RECORD = os.environ.get('FANTASY_RECORD')
+TEAM_REFRESH_CONCURRENCY = 8
+ATHLETE_CONCURRENCY = 8
+ATHLETE_TTL = 6 * 3600
+ATHLETE_STATS_TTL = 3600
+BACKGROUND_WORKERS = 4
+
+#Metrics (spans around upstream calls, SQL and rendering; off unless FANTASY_METRICS=1)
+METRICS_ENABLED = os.environ.get('FANTASY_METRICS') == '1'
+
+#Page cache (seconds, 0 = until the underlying data changes)
+CACHE_DATABASE = 'database/cache.db'
+CACHE_MAX_ENTRIES = 500
+TEAM_CACHE_TIMEOUT = 0
+
 #DB keys
-DATABASE = 'database/db_fantasy.db'
\ No newline at end of file
+DATABASE = 'database/db_fantasy.db'
+DB_BUSY_TIMEOUT = 10
+MIGRATION_LOCK_TIMEOUT = 300
+DB_CACHE_KB = 32768
+DB_MMAP_BYTES = 256 * 1024 * 1024
+
+#Ingestion (seconds; FANTASY_INGEST=0 keeps a process from polling, e.g. web workers when
+#`python -m backend.scheduler` runs on its own; INGEST_LEASE = how long a dead poller blocks the others)
+INGEST_ENABLED = os.environ.get('FANTASY_INGEST', '1') != '0'
+INGEST_LEASE = 120
+INGEST_INTERVAL = 60
+INGEST_MAX_BACKOFF = 900
+INGEST_STALE_AFTER = 180
+
+#Backfill (None = one parser process per CPU)
+BACKFILL_WORKERS = None
+BACKFILL_FETCH_CONCURRENCY = 8
+BACKFILL_WEEKS = {2: 18, 3: 5}
+
+#JSON API (games per page for /api/v1/games, longest window for /api/v1/games/upcoming)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_UPCOMING_HOURS = 7 * 24
+
+#Sleeper player dump (seconds between loads; players per write batch; bytes read at a time)
+SLEEPER_REFRESH = 24 * 3600
+SLEEPER_BATCH = 1000
+SLEEPER_CHUNK = 64 * 1024
+
+#Sleeper to ESPN crosswalk (name similarity from 0 to 1 needed for a fuzzy match, and its lead over the runner-up)
+CROSSWALK_MIN_SCORE = 0.85
+CROSSWALK_MARGIN = 0.05
+
+#Live stream (seconds; STREAM_QUEUE = updates buffered per viewer before it is dropped)
+STREAM_POLL = 5
+STREAM_HEARTBEAT = 15
+STREAM_QUEUE = 100
+
+#Polling cadence (seconds)
+POLL_LIVE = 15
+POLL_BREAK = 60
+POLL_PREGAME = 120
+POLL_IDLE = 3600
+PREGAME_WINDOW = 2 * 3600
+POLL_FINAL_RECHECK = 12 * 3600
+LIVE_WINDOW = 6 * 3600
+
+#Fantasy scoring (CUSTOM_SCORING maps player_game_stats columns to points per unit over the standard rules;
+#run `python -m backend.scoring` after changing it to rescore stored games)
+DEFAULT_SCORING = 'ppr'
+FANTASY_LEADERS = 5
+CUSTOM_SCORING = {}
@@ -0,0 +1,252 @@
+import argparse
+import difflib
+import re
+import time
+import unicodedata
+import backend.config as config
+import backend.functions as functions
+import backend.writer as writer
+
+# Maps Sleeper player ids to ESPN athlete ids. Sleeper's own espn_id is taken as
+# is; everyone else is matched by name inside a block of ESPN players on the same
+# team and position group, so each comparison set is a handful of names instead
+# of the whole league. Only Sleeper players without a row are matched on a run.
+
+SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'v'}
+
+NICKNAMES = {
+    'alex': 'alexander',
+    'andy': 'andrew',
+    'ben': 'benjamin',
+    'cam': 'cameron',
+    'chris': 'christopher',
+    'dan': 'daniel',
+    'danny': 'daniel',
+    'dave': 'david',
+    'gabe': 'gabriel',
+    'jake': 'jacob',
+    'jim': 'james',
+    'jimmy': 'james',
+    'joe': 'joseph',
+    'jon': 'jonathan',
+    'josh': 'joshua',
+    'ken': 'kenneth',
+    'kenny': 'kenneth',
+    'matt': 'matthew',
+    'mike': 'michael',
+    'mitch': 'mitchell',
+    'nate': 'nathaniel',
+    'nick': 'nicholas',
+    'pat': 'patrick',
+    'rob': 'robert',
+    'bob': 'robert',
+    'sam': 'samuel',
+    'steve': 'steven',
+    'tom': 'thomas',
+    'tony': 'anthony',
+    'will': 'william',
+    'zach': 'zachary',
+}
+
+# ESPN and Sleeper disagree on a few team abbreviations and position labels.
+TEAM_ALIASES = {'WSH': 'WAS', 'JAC': 'JAX', 'LA': 'LAR'}
+
+POSITION_GROUPS = {
+    'PK': 'K',
+    'FB': 'RB',
+    'DE': 'DL', 'DT': 'DL', 'NT': 'DL',
+    'OLB': 'LB', 'ILB': 'LB', 'MLB': 'LB',
+    'CB': 'DB', 'S': 'DB', 'FS': 'DB', 'SS': 'DB',
+    'OT': 'OL', 'OG': 'OL', 'T': 'OL', 'G': 'OL', 'C': 'OL', 'LS': 'OL',
+}
+
+DIRECT_MATCHES = '''
+    INSERT INTO player_crosswalk (sleeper_id, espn_id, method, score, matched_at)
+    SELECT player_id, espn_id, 'espn_id', 1.0, ? FROM sleeper_players WHERE espn_id IS NOT NULL
+    ON CONFLICT(sleeper_id) DO UPDATE SET
+        espn_id = excluded.espn_id, method = excluded.method, score = excluded.score, matched_at = excluded.matched_at
+    WHERE espn_id IS NOT excluded.espn_id OR method IS NOT excluded.method
+'''
+
+# A name match loses its ESPN id once Sleeper itself links that id to someone.
+DROP_CONFLICTS = '''
+    DELETE FROM player_crosswalk
+    WHERE method != 'espn_id'
+    AND espn_id IN (SELECT espn_id FROM player_crosswalk WHERE method = 'espn_id')
+'''
+
+STORE_MATCH = '''
+    INSERT OR REPLACE INTO player_crosswalk (sleeper_id, espn_id, method, score, matched_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+ESPN_PLAYERS = '''
+    SELECT a.athlete_id, a.player_name, a.position_abv, t.abbreviation, 1
+    FROM athletes a
+    LEFT JOIN (SELECT team_id, MAX(abbreviation) AS abbreviation FROM teams GROUP BY team_id) t ON t.team_id = a.team_id
+    WHERE a.athlete_id IS NOT NULL AND a.player_name IS NOT NULL
+    UNION ALL
+    SELECT p.player_id, p.full_name, NULL, t.abbreviation, 0
+    FROM players p
+    LEFT JOIN (SELECT team_id, MAX(abbreviation) AS abbreviation FROM teams GROUP BY team_id) t ON t.team_id = p.team_id
+    WHERE p.full_name IS NOT NULL
+'''
+
+UNMATCHED_SLEEPER_PLAYERS = '''
+    SELECT s.player_id, s.full_name, s.position, s.team, s.active
+    FROM sleeper_players s
+    LEFT JOIN player_crosswalk c ON c.sleeper_id = s.player_id
+    WHERE c.sleeper_id IS NULL AND s.full_name IS NOT NULL AND s.position IS NOT NULL
+'''
+
+
+def normalize_name(name):
+    text = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower()
+    text = re.sub(r"[.']", '', text)
+    words = [word for word in re.split(r'[^a-z0-9]+', text) if word and word not in SUFFIXES]
+    if words:
+        words[0] = NICKNAMES.get(words[0], words[0])
+    return ' '.join(words)
+
+
+def team_key(abbreviation):
+    if not abbreviation:
+        return None
+    abbreviation = abbreviation.upper()
+    return TEAM_ALIASES.get(abbreviation, abbreviation)
+
+
+def position_group(position):
+    if not position:
+        return None
+    position = position.upper()
+    return POSITION_GROUPS.get(position, position)
+
+
+def load_espn_players(cursor):
+    # Roster athletes carry a position; box score players only fill in ids no roster has loaded.
+    players = {}
+    cursor.execute(ESPN_PLAYERS)
+    for espn_id, name, position, team, from_roster in cursor.fetchall():
+        if espn_id in players and not from_roster:
+            continue
+        players[espn_id] = (normalize_name(name), position_group(position), team_key(team))
+    return players
+
+
+def build_blocks(espn_players, claimed):
+    by_team = {}
+    by_name = {}
+    for espn_id, (name, group, team) in espn_players.items():
+        if espn_id in claimed or not name:
+            continue
+        by_team.setdefault((team, group), []).append((espn_id, name))
+        by_name.setdefault(name, []).append((espn_id, group))
+    return by_team, by_name
+
+
+def best_match(name, candidates):
+    # Returns (espn_id, method, score) or None when nothing is close enough or two are equally close.
+    exact = [espn_id for espn_id, candidate in candidates if candidate == name]
+    if len(exact) == 1:
+        return exact[0], 'exact', 1.0
+    if exact:
+        return None
+
+    # SequenceMatcher caches details about its second sequence, so that is the name being matched.
+    matcher = difflib.SequenceMatcher(None, '', name)
+    scored = []
+    for espn_id, candidate in candidates:
+        matcher.set_seq1(candidate)
+        if matcher.real_quick_ratio() < config.CROSSWALK_MIN_SCORE or matcher.quick_ratio() < config.CROSSWALK_MIN_SCORE:
+            continue
+        scored.append((matcher.ratio(), espn_id))
+    scored.sort(reverse=True)
+
+    if not scored or scored[0][0] < config.CROSSWALK_MIN_SCORE:
+        return None
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < config.CROSSWALK_MARGIN:
+        return None
+    return scored[0][1], 'fuzzy', round(scored[0][0], 4)
+
+
+def match_players(sleeper_players, by_team, by_name):
+    players = []
+    name_counts = {}
+    for sleeper_id, full_name, position, team, active in sleeper_players:
+        name = normalize_name(full_name)
+        if not name:
+            continue
+        group = position_group(position)
+        players.append((sleeper_id, name, group, team_key(team), active))
+        if active:
+            name_counts[(name, group)] = name_counts.get((name, group), 0) + 1
+
+    proposals = []
+    for sleeper_id, name, group, team, active in players:
+        match = None
+        if team:
+            # ESPN ids seen only in box scores have no position, so they sit in the team's None block.
+            candidates = by_team.get((team, group), []) + by_team.get((team, None), [])
+            match = best_match(name, candidates)
+            if match is not None:
+                proposals.append((0, -match[2], sleeper_id, match[0], match[1], match[2]))
+                continue
+
+        # Traded or released players: an exact name in the same position group anywhere in the
+        # league, as long as neither side has a namesake.
+        if active and name_counts[(name, group)] == 1:
+            same_name = [espn_id for espn_id, candidate_group in by_name.get(name, ()) if candidate_group in (group, None)]
+            if len(same_name) == 1:
+                proposals.append((1, -1.0, sleeper_id, same_name[0], 'exact', 1.0))
+
+    # Team matches, then the best scores, claim their ESPN id first, so no id is given twice.
+    proposals.sort()
+    taken = set()
+    matches = []
+    for _, _, sleeper_id, espn_id, method, score in proposals:
+        if espn_id in taken:
+            continue
+        taken.add(espn_id)
+        matches.append((sleeper_id, espn_id, method, score))
+    return matches
+
+
+def update(rebuild=False):
+    started = time.perf_counter()
+    now = int(time.time())
+
+    if rebuild:
+        dropped = writer.write([("DELETE FROM player_crosswalk WHERE method != 'espn_id'", [()])], tags=['crosswalk'])
+        print(f"Crosswalk: dropped {dropped} name matches")
+    direct = writer.write([(DIRECT_MATCHES, [(now,)]), (DROP_CONFLICTS, [()])], tags=['crosswalk'])
+
+    cursor = functions.get_database(readonly=True).cursor()
+    cursor.execute('SELECT espn_id FROM player_crosswalk')
+    claimed = {row[0] for row in cursor.fetchall()}
+    by_team, by_name = build_blocks(load_espn_players(cursor), claimed)
+
+    cursor.execute(UNMATCHED_SLEEPER_PLAYERS)
+    unmatched = cursor.fetchall()
+    matches = match_players(unmatched, by_team, by_name)
+
+    writer.write([(STORE_MATCH, [match + (now,) for match in matches])], tags=['crosswalk'])
+
+    methods = {}
+    for _, _, method, _ in matches:
+        methods[method] = methods.get(method, 0) + 1
+    print(f"Crosswalk: {direct} direct rows changed, {len(matches)} of {len(unmatched)} unmatched players matched "
+          f"({', '.join(f'{count} {method}' for method, count in sorted(methods.items())) or 'none'}) "
+          f"in {time.perf_counter() - started:.2f}s")
+    return len(matches)
+
+
+if __name__ == '__main__':
+    import database
+
+    parser = argparse.ArgumentParser(description='Match Sleeper players to ESPN athletes.')
+    parser.add_argument('--rebuild', action='store_true', help='drop every name match and start over')
+    args = parser.parse_args()
+
+    database.init()
+    update(args.rebuild)
@@ -0,0 +1,40 @@
+import os
+import shutil
+from urllib.parse import urlencode, parse_qsl, urlsplit
+
+# Recorded upstream responses live under one directory, one file per URL:
+#   <dir>/<host>/<path>[__<sorted query>].json
+
+
+def path_for(directory, url):
+    parts = urlsplit(url)
+    name = parts.path.strip('/') or 'index'
+    query = sorted(parse_qsl(parts.query))
+    if query:
+        name += '__' + urlencode(query)
+    return os.path.join(directory, parts.netloc, *name.split('/')) + '.json'
+
+
+def load(directory, url):
+    path = path_for(directory, url)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def save(directory, url, content):
+    path = path_for(directory, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def save_file(directory, url, f):
+    # For responses too large to hold in memory, copied from an open file.
+    path = path_for(directory, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(f, out)
+    return path
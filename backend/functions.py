@@ -1,535 +1,966 @@
 from flask import Flask, render_template, request
 from datetime import datetime
-from zoneinfo import ZoneInfo
 import sqlite3
-import requests
 import json
+import hashlib
+import threading
+import time
 import backend.config as config
+import backend.client as client
+import backend.writer as writer
+import backend.queries as queries
+import backend.metrics as metrics
+import backend.stats as stats
+import backend.scoring as scoring
+import backend.cadence as cadence
 import asyncio
-import aiohttp
 
-def get_database():
-    return sqlite3.connect(config.DATABASE)
+_connections = threading.local()
+
+
+def _connect(readonly):
+    factory = metrics.TimedConnection if config.METRICS_ENABLED else sqlite3.Connection
+
+    if readonly:
+        conn = sqlite3.connect(f'file:{config.DATABASE}?mode=ro', uri=True, timeout=config.DB_BUSY_TIMEOUT, factory=factory)
+    else:
+        conn = sqlite3.connect(config.DATABASE, timeout=config.DB_BUSY_TIMEOUT, factory=factory)
+
+    if config.METRICS_ENABLED:
+        conn.role = 'reader' if readonly else 'writer'
+
+    if readonly:
+        conn.execute('PRAGMA query_only = ON')
+    else:
+        conn.execute('PRAGMA journal_mode = WAL')
+
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA busy_timeout = {int(config.DB_BUSY_TIMEOUT * 1000)}')
+    conn.execute(f'PRAGMA cache_size = -{config.DB_CACHE_KB}')
+    conn.execute(f'PRAGMA mmap_size = {config.DB_MMAP_BYTES}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+def get_database(readonly=False):
+    key = 'reader' if readonly else 'writer'
+    conn = getattr(_connections, key, None)
+
+    if conn is None:
+        conn = _connect(readonly)
+        setattr(_connections, key, conn)
+    elif conn.in_transaction:
+        # Rolling back here would throw away work the caller still thinks is pending.
+        raise RuntimeError(f'{key} connection reused with a transaction still open')
+    return conn
+
+
+def boxscore_url(game_id):
+    return f'https://cdn.espn.com/core/nfl/boxscore?xhr=1&gameId={game_id}'
+
+
+def scoreboard_url(season, season_type, week):
+    return f'{config.API_URL_ESPN}?dates={season}&seasontype={season_type}&week={week}'
+
+
+def team_schedule_url(team_id):
+    return f'https://site.api.espn.com/apis/site/v2/sports/football/nfl/teams/{team_id}/schedule'
+
+
+def team_record_url(season, team_id):
+    return f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/seasons/{season}/types/2/teams/{team_id}/record'
+
+
+def team_depth_chart_url(season, team_id):
+    return f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/seasons/{season}/teams/{team_id}/depthcharts'
+
+
+def athlete_splits_url(athlete_id):
+    return f'https://site.web.api.espn.com/apis/common/v3/sports/football/nfl/athletes/{athlete_id}/splits'
+
+
+def athlete_projections_url(season, athlete_id):
+    return f'http://sports.core.api.espn.com/v2/sports/football/leagues/nfl/seasons/{season}/types/2/athletes/{athlete_id}/projections?lang=en&region=us'
+
+
+def odds_url(game_id):
+    return f'https://sports.core.api.espn.com/v2/sports/football/leagues/nfl/events/{game_id}/competitions/{game_id}/odds'
+
+
+STORE_ODDS_PROVIDER = '''
+    INSERT OR IGNORE INTO odds_provider (provider_id, name, priority) VALUES (?, ?, 1)
+'''
+
+STORE_ODDS = '''
+    INSERT INTO odds (
+        game_id, provider_id, details, over_under, spread, over_odds, under_odds, moneyline_winner, spread_winner
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(game_id, provider_id) DO UPDATE SET
+        details = excluded.details, over_under = excluded.over_under, spread = excluded.spread,
+        over_odds = excluded.over_odds, under_odds = excluded.under_odds,
+        moneyline_winner = excluded.moneyline_winner, spread_winner = excluded.spread_winner
+    WHERE (details, over_under, spread, over_odds, under_odds, moneyline_winner, spread_winner)
+        IS NOT (excluded.details, excluded.over_under, excluded.spread, excluded.over_odds,
+                excluded.under_odds, excluded.moneyline_winner, excluded.spread_winner)
+'''
+
+# Runs after STORE_ODDS in the same batch, so the odds row it points at exists.
+STORE_TEAM_ODDS = '''
+    INSERT INTO team_odds (odds_id, team_id, game_id, favorite, underdog, moneyline, spread_odds, point_spread)
+    SELECT odds_id, ?, game_id, ?, ?, ?, ?, ? FROM odds WHERE game_id = ? AND provider_id = ?
+    ON CONFLICT(odds_id, team_id) DO UPDATE SET
+        favorite = excluded.favorite, underdog = excluded.underdog, moneyline = excluded.moneyline,
+        spread_odds = excluded.spread_odds, point_spread = excluded.point_spread
+    WHERE (favorite, underdog, moneyline, spread_odds, point_spread)
+        IS NOT (excluded.favorite, excluded.underdog, excluded.moneyline, excluded.spread_odds, excluded.point_spread)
+'''
+
+
+def odds_team_id(cursor, team_odds):
+    team_id = team_odds['team']['$ref'].split('/')[-1].split('?')[0]
+    cursor.execute('SELECT team_id FROM teams WHERE team_id = ?', (team_id,))
+    if cursor.fetchone():
+        return team_id
+
+    abbreviation = team_odds['team'].get('abbreviation', None)
+    cursor.execute('SELECT team_id FROM teams WHERE abbreviation = ?', (abbreviation,))
+    matching_team = cursor.fetchone()
+    if matching_team:
+        return matching_team[0]
+
+    print(f"No match for team {team_id} or {abbreviation} in teams table.")
+    return team_id
+
+
+def parse_odds(odds_data, cursor):
+    provider_rows = []
+    odds_rows = []
+    team_odds_rows = []
+
+    for item in odds_data['items']:
+        game_id = item['$ref'].split('/')[-3]
+        provider_id = item['provider']['id']
+
+        provider_rows.append((provider_id, item['provider']['name']))
+        odds_rows.append((
+            game_id,
+            provider_id,
+            item.get('details', 'N/A'),
+            item.get('overUnder', None),
+            item.get('spread', None),
+            item.get('overOdds', None),
+            item.get('underOdds', None),
+            item.get('moneylineWinner', False),
+            item.get('spreadWinner', False),
+        ))
+
+        for team_odds in (item['homeTeamOdds'], item['awayTeamOdds']):
+            point_spread = (
+                team_odds.get('current', {})
+                .get('pointSpread', {})
+                .get('alternateDisplayValue', None)
+            )
+            team_odds_rows.append((
+                odds_team_id(cursor, team_odds),
+                team_odds.get('favorite', False),
+                team_odds.get('underdog', False),
+                team_odds.get('moneyLine', None),
+                team_odds.get('spreadOdds', None),
+                point_spread,
+                game_id,
+                provider_id,
+            ))
+
+    return provider_rows, odds_rows, team_odds_rows
 
 
 def fetch_and_store_odds(url):
-    response = requests.get(url)
-    
+    response = client.get(url)
+
     if response.status_code == 200:
         odds_data = response.json()
 
         if 'items' not in odds_data or not odds_data['items']:
             print("No odds data found in API response.")
             return
-        
-        conn = get_database()
-        cursor = conn.cursor()
-
-        for item in odds_data['items']:
-            game_id = item['$ref'].split('/')[-3]
-            provider_id = item['provider']['id']
-            provider_name = item['provider']['name']
-            details = item.get('details', 'N/A')
-            over_under = item.get('overUnder', None)
-            spread = item.get('spread', None)
-            over_odds = item.get('overOdds', None)
-            under_odds = item.get('underOdds', None)
-            moneyline_winner = item.get('moneylineWinner', False)
-            spread_winner = item.get('spreadWinner', False)
-
-            cursor.execute('''
-                INSERT OR IGNORE INTO odds_provider (provider_id, name, priority)
-                VALUES (?, ?, ?)
-            ''', (provider_id, provider_name, 1))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO odds (
-                    game_id,
-                    provider_id,
-                    details,
-                    over_under,
-                    spread,
-                    over_odds,
-                    under_odds,
-                    moneyline_winner,
-                    spread_winner
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                game_id,
-                provider_id,
-                details,
-                over_under,
-                spread,
-                over_odds,
-                under_odds,
-                moneyline_winner,
-                spread_winner
-            ))
 
-            odds_id = cursor.lastrowid
-
-            home_team = item['homeTeamOdds']
-            away_team = item['awayTeamOdds']
-
-            for team_odds in [home_team, away_team]:
-                team_id = team_odds['team']['$ref'].split('/')[-1]
-                favorite = team_odds.get('favorite', False)
-                underdog = team_odds.get('underdog', False)
-                moneyline = team_odds.get('moneyLine', None)
-                spread_odds = team_odds.get('spreadOdds', None)
-                point_spread = (
-                    team_odds.get('current', {})
-                    .get('pointSpread', {})
-                    .get('alternateDisplayValue', None)
-                )
-                
-                cursor.execute('SELECT team_id FROM teams WHERE team_id = ?', (team_id,))
-                matching_team = cursor.fetchone()
-
-                if not matching_team:
-                    abbreviation = team_odds['team'].get('abbreviation', None)
-                    cursor.execute('SELECT team_id FROM teams WHERE abbreviation = ?', (abbreviation,))
-                    matching_team = cursor.fetchone()
-
-                    if matching_team:
-                        team_id = matching_team[0]
-                    else:
-                        print(f"No match for team {team_id} or {abbreviation} in teams table.")
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO team_odds (
-                        odds_id,
-                        team_id,
-                        game_id,
-                        favorite,
-                        underdog,
-                        moneyline,
-                        spread_odds,
-                        point_spread
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    odds_id,
-                    team_id,
-                    game_id,
-                    favorite,
-                    underdog,
-                    moneyline,
-                    spread_odds,
-                    point_spread
-                ))
-
-        cursor.execute("SELECT * FROM team_odds WHERE game_id = ?", (game_id,))
-        stored_team_odds = cursor.fetchall()
-
-        conn.commit()
-        conn.close()
-    else:
+        provider_rows, odds_rows, team_odds_rows = parse_odds(odds_data, get_database(readonly=True).cursor())
+        return writer.write([
+            (STORE_ODDS_PROVIDER, provider_rows),
+            (STORE_ODDS, odds_rows),
+            (STORE_TEAM_ODDS, team_odds_rows),
+        ], tags=('odds',))
+    elif response.status_code != 304:
         print("Failed to fetch odds from API.")
 
-def fetch_and_store_live_data():
-    response = requests.get(config.API_URL_ESPN)
-    if response.status_code == 200:
-        espn_data = response.json()
-        events = espn_data.get('events', [])
-        leagues = espn_data.get('leagues', [])
-        
-        conn = get_database()
-        cursor = conn.cursor()
-
-        for league in leagues :
-            league_id = league['id']
-            league_year = league['season']['year']
-            start_date = league['season']['startDate']
-            end_date = league['season']['endDate']
-            league_type = league['season']['type']['type']
-            league_name = league['season']['type']['name']
-
-            cursor.execute("""
-                INSERT OR REPLACE INTO leagueInfo (id, year, startdate, enddate, type, name)
-                           VALUES(?,?,?,?,?,?)
-            """, (league_id, league_year, start_date, end_date, league_type, league_name))
-        
-        for event in events:
-            game_id = event['id']
-            year = event['season']['year']
-            season_id = event['season']['type']
-            name = event['name']
-            date = event['date']
-            date = date.replace('Z', '+0000')
-            date = datetime.strptime(date, '%Y-%m-%dT%H:%M%z').astimezone(ZoneInfo('America/New_York')).strftime('%m/%d/%Y @ %I:%M %p')
-            week = event['week']['number']
-            down = event['competitions'][0].get('situation', {}).get('downDistanceText', 'No play')
-            detailed_text = event['competitions'][0].get('situation', {}).get('lastPlay', {}).get('text', 'No play description available')
-            status = event['status']['type']['description']
-            clock = event['status']['displayClock']
-            period = event['status']['period']
-            venue = event['competitions'][0]['venue']
-            venue_id = venue['id']
-            venue_name = venue['fullName']
-            city = venue['address']['city']
-            state = venue['address']['state']
-            indoor = venue['indoor']
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO games (game_id, name, date, week, venue_id, status, clock, period, down, detailed_text, year, season_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?,?,?,?,?,?)
-            ''', (game_id, name, date, week, venue_id, status, clock, period, down, detailed_text, year, season_id))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO venues (venue_id, full_name, city, state, indoor)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (venue_id, venue_name, city, state, indoor))
-
-            for competition in event['competitions']:
-                for team in competition['competitors']:
-                    team_id = team['team']['id']
-                    team_name = team['team']['displayName']
-                    score = int(team['score']) if 'score' in team else 0
-                    home_away = team['homeAway']
-                    abbreviation = team['team']['abbreviation']
-                    logo = team['team']['logo']
-
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO teams (team_id, game_id, team_name, score, home_away, abbreviation, logo)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (team_id, game_id, team_name, score, home_away, abbreviation, logo))
+def fingerprint(row):
+    return hashlib.sha1(json.dumps(row, default=str).encode()).hexdigest()
+
+
+def load_fingerprints(cursor, entity):
+    cursor.execute('SELECT entity_id, digest FROM fingerprints WHERE entity = ?', (entity,))
+    return dict(cursor.fetchall())
+
+
+def clear_fingerprints(entity, entity_ids):
+    return ('DELETE FROM fingerprints WHERE entity = ? AND entity_id = ?',
+            [(entity, entity_id) for entity_id in entity_ids])
+
+
+def save_fingerprints(new_fingerprints):
+    return ('''
+        INSERT OR REPLACE INTO fingerprints (entity, entity_id, digest)
+        VALUES (?, ?, ?)
+    ''', new_fingerprints)
+
+
+def changed_fingerprints(entity, rows_by_id):
+    known = load_fingerprints(get_database(readonly=True).cursor(), entity)
+    changed = []
+    for entity_id, row in rows_by_id.items():
+        digest = fingerprint(row)
+        if known.get(entity_id) != digest:
+            changed.append((entity, entity_id, digest))
+    return changed
+
+
+def current_season():
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(queries.CURRENT_SEASON)
+    season = cursor.fetchone()[0]
+    if season is not None:
+        return int(season)
+
+    # Nothing polled yet: a season runs from September into the next February.
+    today = datetime.now()
+    return today.year if today.month >= 3 else today.year - 1
+
+
+def current_game_ids():
+    # The slate the last scoreboard poll stored, whichever process ran it.
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(queries.CURRENT_WEEK_GAME_IDS)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_versions(tags):
+    cursor = get_database(readonly=True).cursor()
+    versions = []
+    for tag in tags:
+        cursor.execute('SELECT version FROM data_versions WHERE tag = ?', (tag,))
+        row = cursor.fetchone()
+        versions.append(row[0] if row else 0)
+    return versions
+
+
+def parse_scoreboard(espn_data):
+    events = espn_data.get('events', [])
+    leagues = espn_data.get('leagues', [])
+
+    league_rows = []
+    game_rows = []
+    venue_rows = []
+    team_rows = []
+
+    for league in leagues :
+        league_id = league['id']
+        league_year = league['season']['year']
+        start_date = league['season']['startDate']
+        end_date = league['season']['endDate']
+        league_type = league['season']['type']['type']
+        league_name = league['season']['type']['name']
+
+        league_rows.append((league_id, league_year, start_date, end_date, league_type, league_name))
+
+    for event in events:
+        game_id = event['id']
+        year = event['season']['year']
+        season_id = event['season']['type']
+        name = event['name']
+        date = event['date']
+        kickoff = cadence.parse_kickoff(date)
+        week = event['week']['number']
+        down = event['competitions'][0].get('situation', {}).get('downDistanceText', 'No play')
+        detailed_text = event['competitions'][0].get('situation', {}).get('lastPlay', {}).get('text', 'No play description available')
+        status = event['status']['type']['description']
+        clock = event['status']['displayClock']
+        period = event['status']['period']
+        venue = event['competitions'][0]['venue']
+        venue_id = venue['id']
+        venue_name = venue['fullName']
+        city = venue['address']['city']
+        state = venue['address']['state']
+        indoor = venue['indoor']
+
+        game_rows.append((game_id, name, date, week, venue_id, status, clock, period, down, detailed_text, year, season_id, kickoff))
+        venue_rows.append((venue_id, venue_name, city, state, indoor))
+
+        for competition in event['competitions']:
+            for team in competition['competitors']:
+                team_id = team['team']['id']
+                team_name = team['team']['displayName']
+                score = int(team['score']) if 'score' in team else 0
+                home_away = team['homeAway']
+                abbreviation = team['team']['abbreviation']
+                logo = team['team']['logo']
+
+                team_rows.append((team_id, game_id, team_name, score, home_away, abbreviation, logo))
+
+    return league_rows, game_rows, venue_rows, team_rows
+
+
+SET_CURRENT_WEEK = '''
+    INSERT INTO current_week (id, season, season_type, week) VALUES (1, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET season = excluded.season, season_type = excluded.season_type, week = excluded.week
+    WHERE season != excluded.season OR season_type != excluded.season_type OR week != excluded.week
+'''
+
+
+def scoreboard_statements(league_rows, game_rows, venue_rows, team_rows):
+    # Runs after the games and teams upserts in the same batch, so it sees the new rows.
+    game_ids = list(dict.fromkeys([row[0] for row in game_rows] + [row[1] for row in team_rows]))
+    return [
+        ("""
+            INSERT OR REPLACE INTO leagueInfo (id, year, startdate, enddate, type, name)
+                       VALUES(?,?,?,?,?,?)
+        """, league_rows),
+        ('''
+            INSERT OR REPLACE INTO games (game_id, name, date, week, venue_id, status, clock, period, down, detailed_text, year, season_id, kickoff)
+            VALUES (?, ?, ?, ?, ?, ?, ?,?,?,?,?,?,?)
+        ''', game_rows),
+        ('''
+            INSERT OR REPLACE INTO venues (venue_id, full_name, city, state, indoor)
+            VALUES (?, ?, ?, ?, ?)
+        ''', venue_rows),
+        ('''
+            INSERT OR REPLACE INTO teams (team_id, game_id, team_name, score, home_away, abbreviation, logo)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', team_rows),
+        (queries.REFRESH_SCOREBOARD.format(where='WHERE g.game_id = ?'), [(game_id,) for game_id in game_ids]),
+    ]
 
-        
-        conn.commit()
-        conn.close()
 
-def fetch_and_store_data_for_depthChart(url, team_id):
-    response = requests.get(url)
+def fetch_and_store_live_data():
+    response = client.get(config.API_URL_ESPN)
     if response.status_code == 200:
-        espn_data = response.json()
-        items = espn_data.get('items', [])
-        data_to_insert = []
-
-        with get_database() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM depthChart WHERE team_id = ?", (team_id,))
-            
-            for item in items:
-                position_category = item['name']
-                positions = item.get('positions', {})
-
-                for value in positions.values():
-                    abbreviation = value['position']['abbreviation']
-                    athletes_info = value.get('athletes', [])
-
-                    for athlete in athletes_info:
-                        slot = athlete['slot']
-                        rank = athlete['rank']
-                        athlete_url = athlete.get('athlete', {}).get('$ref', None)
-                        athlete_url = athlete_url.rstrip('/') if athlete_url else None
-                        
-                        data_to_insert.append((team_id, position_category, abbreviation, slot, rank, athlete_url))
-
-            cursor.executemany("""
+        league_rows, game_rows, venue_rows, team_rows = parse_scoreboard(response.json())
+        game_ids = [row[0] for row in game_rows]
+        # The slate is a single week; home() shows whichever week it was.
+        current_week = [(row[10], row[11], row[3]) for row in game_rows[:1]]
+
+        new_fingerprints = []
+        tags = set()
+
+        cursor = get_database(readonly=True).cursor()
+        known = {entity: load_fingerprints(cursor, entity) for entity in ('league', 'game', 'venue', 'team')}
+
+        def changed(entity, entity_id, row):
+            digest = fingerprint(row)
+            if known[entity].get(entity_id) == digest:
+                return False
+            known[entity][entity_id] = digest
+            new_fingerprints.append((entity, entity_id, digest))
+            return True
+
+        league_rows = [row for row in league_rows if changed('league', row[0], row)]
+        venue_rows = [row for row in venue_rows if changed('venue', row[0], row)]
+
+        changed_games = set()
+        for row in game_rows:
+            if changed('game', row[0], row):
+                changed_games.add(row[0])
+                tags.add(f'game:{row[0]}')
+        game_rows = [row for row in game_rows if row[0] in changed_games]
+
+        changed_teams = []
+        for row in team_rows:
+            team_id, game_id = row[0], row[1]
+            if changed('team', f'{game_id}:{team_id}', row):
+                changed_teams.append(row)
+                tags.add(f'game:{game_id}')
+                tags.add(f'team:{team_id}')
+            elif game_id in changed_games:
+                tags.add(f'team:{team_id}')
+        team_rows = changed_teams
+
+        writer.write(
+            scoreboard_statements(league_rows, game_rows, venue_rows, team_rows) + [
+                (SET_CURRENT_WEEK, current_week),
+                save_fingerprints(new_fingerprints),
+            ],
+            tags=tags,
+        )
+        rows_touched = len(league_rows) + len(game_rows) + len(venue_rows) + len(team_rows)
+
+        return game_ids, rows_touched
+
+    if response.status_code == 304:
+        return current_game_ids(), 0
+
+    print(f"Failed to fetch live data: {response.status_code}")
+
+def store_depth_chart(espn_data, team_id):
+    items = espn_data.get('items', [])
+    data_to_insert = []
+
+    for item in items:
+        position_category = item['name']
+        positions = item.get('positions', {})
+
+        for value in positions.values():
+            abbreviation = value['position']['abbreviation']
+            athletes_info = value.get('athletes', [])
+
+            for athlete in athletes_info:
+                slot = athlete['slot']
+                rank = athlete['rank']
+                athlete_url = athlete.get('athlete', {}).get('$ref', None)
+                athlete_url = athlete_url.rstrip('/') if athlete_url else None
+                
+                data_to_insert.append((team_id, position_category, abbreviation, slot, rank, athlete_url))
+
+    new_fingerprints = changed_fingerprints('depth_chart', {team_id: data_to_insert})
+    if new_fingerprints:
+        writer.write([
+            ("DELETE FROM depthChart WHERE team_id = ?", [(team_id,)]),
+            ("""
                 INSERT INTO depthChart (team_id, position_category, position_abbreviation, slot, rank, athlete_url)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, data_to_insert)
-            conn.commit()
+            """, data_to_insert),
+            save_fingerprints(new_fingerprints),
+        ], tags=[f'team:{team_id}'])
 
+    return list(dict.fromkeys(row[5] for row in data_to_insert if row[5]))
 
-async def fetch_player_data(session, url):
-    async with session.get(url) as response:
-        return await response.json(), url
+def fetch_and_store_data_for_depthChart(url, team_id):
+    response = client.get(url)
+    if response.status_code == 200:
+        return store_depth_chart(response.json(), team_id)
+
+
+def parse_athlete(espn_data, url, team_id):
+    player_full_name = espn_data['fullName']
+    shortName = espn_data.get('shortName', player_full_name)
+    weight = espn_data.get('displayWeight', 'N/A')
+    height = espn_data.get('displayHeight', 'N/A')
+    age = espn_data.get('age', None)
+    dob = espn_data.get('dateOfBirth', None)
+
+    if dob:
+        dob = dob.replace('Z', '+0000')
+        try:
+            dob = datetime.strptime(dob, '%Y-%m-%dT%H:%M%z')
+        except ValueError:
+            dob = None 
+    else:
+        dob = None
+
+    slug = espn_data.get('slug', 'N/A')
+    headshot = espn_data.get('headshot', {}).get('href', None)
+    jersey = espn_data.get('jersey', "N/A")
+    position = espn_data.get('position', {})
+    position_name = position.get('displayName', 'N/A')
+    position_abv = position.get('abbreviation', 'N/A')
+    statistics_url = espn_data.get('statistics', {}).get('$ref', None)
+    projections_url = espn_data.get('projections', {}).get('$ref', None)
+    player_status = espn_data.get('status', {}).get('type', {})
+    athlete_url = url
+    athlete_id = espn_data.get('id', 'N/A')
+
+    return (team_id, player_full_name, shortName, weight, height, age, dob, slug, headshot, jersey,
+            position_name, position_abv, athlete_url, statistics_url, projections_url, player_status, athlete_id)
+
+
+def team_athlete_urls(team_id):
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(queries.TEAM_ATHLETE_URLS, (team_id,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def stale_athlete_urls(urls, team_id):
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(queries.FRESH_ATHLETE_URLS, (team_id, int(time.time()) - config.ATHLETE_TTL))
+    fresh = {row[0] for row in cursor.fetchall()}
+    return [url for url in urls if url not in fresh]
+
+
+async def fetch_player_data(session, url, semaphore):
+    async with semaphore:
+        try:
+            status, espn_data = await client.fetch_json_async(session, url)
+            return status, espn_data, url
+        except Exception as e:
+            print(f"Failed to fetch athlete {url}: {e}")
+            return None, None, url
+
+
+SQLITE_TYPES = (str, int, float, bytes, datetime)
+
+
+def bindable(row):
+    return all(value is None or isinstance(value, SQLITE_TYPES) for value in row)
+
+
+TOUCH_ATHLETE = 'UPDATE athletes SET fetched_at = ? WHERE athlete_url = ? AND team_id = ?'
+
+
+async def store_player_data(session, urls, team_id, semaphore):
+    urls = await asyncio.to_thread(stale_athlete_urls, urls, team_id)
+    if not urls:
+        return 0
+
+    results = await asyncio.gather(*[fetch_player_data(session, url, semaphore) for url in urls])
+
+    fetched_at = int(time.time())
+    athlete_rows = []
+    unchanged = []
+    parsed = {}
+    for status, espn_data, url in results:
+        if status == 304:
+            unchanged.append((fetched_at, url, team_id))
+            continue
+        if not espn_data:
+            continue
+        try:
+            row = parse_athlete(espn_data, url, team_id)
+        except (KeyError, TypeError, AttributeError) as e:
+            print(f"Skipping athlete {url}: unexpected payload ({e})")
+            continue
+        # One row SQLite cannot bind would fail the whole team's batch in the writer.
+        if not bindable(row):
+            print(f"Skipping athlete {url}: unexpected value types")
+            continue
+        athlete_rows.append(row + (fetched_at,))
+        parsed[f'{team_id}:{url}'] = row
+
+    new_fingerprints = await asyncio.to_thread(changed_fingerprints, 'athlete', parsed)
+
+    await asyncio.to_thread(writer.write, [
+        ("""
+            INSERT OR REPLACE INTO athletes (
+                team_id, player_name, shortName, weight, height, age, dob, slug, headshot, jersey,
+                position_name, position_abv, athlete_url, statistics_url, projections_url, player_status, athlete_id,
+                fetched_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, athlete_rows),
+        (TOUCH_ATHLETE, unchanged),
+        save_fingerprints(new_fingerprints),
+    ], [f'team:{team_id}'] if new_fingerprints else ())
+    return len(athlete_rows)
 
 
 async def fetch_and_store_player_data_async(urls, team_id):
-    async with aiohttp.ClientSession() as session:
-        tasks = [fetch_player_data(session, url) for url in urls]
-        results = await asyncio.gather(*tasks)
-
-        with get_database() as conn:
-            cursor = conn.cursor()
-            for espn_data, url in results:
-                if espn_data:
-                    player_full_name = espn_data['fullName']
-                    shortName = espn_data.get('shortName', player_full_name)
-                    weight = espn_data.get('displayWeight', 'N/A')
-                    height = espn_data.get('displayHeight', 'N/A')
-                    age = espn_data.get('age', None)
-                    dob = espn_data.get('dateOfBirth', None)
-
-                    if dob:
-                        dob = dob.replace('Z', '+0000')
-                        try:
-                            dob = datetime.strptime(dob, '%Y-%m-%dT%H:%M%z')
-                        except ValueError:
-                            dob = None 
-                    else:
-                        dob = None
-
-                    slug = espn_data.get('slug', 'N/A')
-                    headshot = espn_data.get('headshot', {}).get('href', None)
-                    jersey = espn_data.get('jersey', "N/A")
-                    position = espn_data.get('position', {})
-                    position_name = position.get('displayName', 'N/A')
-                    position_abv = position.get('abbreviation', 'N/A')
-                    statistics_url = espn_data.get('statistics', {}).get('$ref', None)
-                    projections_url = espn_data.get('projections', {}).get('$ref', None)
-                    player_status = espn_data.get('status', {}).get('type', {})
-                    athlete_url = url
-                    athlete_id = espn_data.get('id', 'N/A')
-
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO athletes (
-                            team_id, player_name, shortName, weight, height, age, dob, slug, headshot, jersey,
-                            position_name, position_abv, athlete_url, statistics_url, projections_url, player_status, athlete_id
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (team_id, player_full_name, shortName, weight, height, age, dob, slug, headshot, jersey,
-                          position_name, position_abv, athlete_url, statistics_url, projections_url, player_status, athlete_id))
-            conn.commit()
-
-def fetch_and_store_athlete(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        espn_data = response.json()
+    semaphore = asyncio.Semaphore(config.ATHLETE_CONCURRENCY)
+    async with client.async_session() as session:
+        return await store_player_data(session, urls, team_id, semaphore)
+
+
+async def refresh_team_async(team_id, schedule_url, record_url, depth_url):
+    semaphore = asyncio.Semaphore(config.TEAM_REFRESH_CONCURRENCY)
+    athlete_semaphore = asyncio.Semaphore(config.ATHLETE_CONCURRENCY)
+
+    async with client.async_session() as session:
+        async def fetch(url):
+            async with semaphore:
+                return await client.get_json_async(session, url)
+
+        async def refresh_schedule():
+            espn_data = await fetch(schedule_url)
+            if espn_data:
+                await asyncio.to_thread(store_competition_results, espn_data, team_id)
+
+        async def refresh_record():
+            espn_data = await fetch(record_url)
+            if espn_data:
+                await asyncio.to_thread(store_team_records, espn_data, team_id)
+
+        async def refresh_depth_chart_and_athletes():
+            espn_data = await fetch(depth_url)
+            if espn_data:
+                athlete_urls = await asyncio.to_thread(store_depth_chart, espn_data, team_id)
+            else:
+                athlete_urls = await asyncio.to_thread(team_athlete_urls, team_id)
+            await store_player_data(session, athlete_urls, team_id, athlete_semaphore)
+
+        await asyncio.gather(refresh_schedule(), refresh_record(), refresh_depth_chart_and_athletes())
+
+
+STORE_ATHLETE_SPLITS = '''
+    INSERT INTO athlete_splits (athlete_id, season, splits, fetched_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(athlete_id, season) DO UPDATE SET splits = excluded.splits, fetched_at = excluded.fetched_at
+'''
+
+TOUCH_ATHLETE_SPLITS = 'UPDATE athlete_splits SET fetched_at = ? WHERE athlete_id = ? AND season = ?'
+
+STORE_ATHLETE_PROJECTIONS = '''
+    INSERT INTO athlete_projections (athlete_id, season, projections, fetched_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(athlete_id, season) DO UPDATE SET projections = excluded.projections, fetched_at = excluded.fetched_at
+'''
+
+TOUCH_ATHLETE_PROJECTIONS = 'UPDATE athlete_projections SET fetched_at = ? WHERE athlete_id = ? AND season = ?'
+
 
-        split_labels = espn_data.get('labels', [])
-        split_categories = espn_data.get('splitCategories', [])
+def load_athlete_payload(sql, athlete_id, season):
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(sql, (athlete_id, season))
+    row = cursor.fetchone()
+    if row is None:
+        return None, None
+    return json.loads(row[0]), row[1]
 
-        player_splits = {}
 
-        for category in split_categories:
-            category_name = category.get('displayName')
-            for split in category.get('splits', []):
-                stat = split.get('abbreviation')
-                stats = split.get('stats', [])
+def load_athlete_splits(athlete_id, season):
+    return load_athlete_payload(queries.PLAYER_SPLITS, athlete_id, season)
 
-                if category_name not in player_splits:
-                    player_splits[category_name] = {}
 
-                if stat not in player_splits[category_name]:
-                    player_splits[category_name][stat] = {}
+def load_athlete_projections(athlete_id, season):
+    return load_athlete_payload(queries.PLAYER_PROJECTIONS, athlete_id, season)
 
-                stat_type = "Rec" if split_labels[0].startswith("CAR") else "Rush"
 
-                seen_labels = {}
-                for idx, (label, value) in enumerate(zip(split_labels, stats)):
-                    if label in seen_labels:
-                        seen_labels[label] += 1
-                        unique_label = f"{stat_type} {label}"
-                    else:
-                        seen_labels[label] = 1
-                        unique_label = label
-                    
-                    player_splits[category_name][stat][unique_label] = value
+def parse_athlete_splits(espn_data):
+    split_labels = espn_data.get('labels', [])
+    split_categories = espn_data.get('splitCategories', [])
+
+    player_splits = {}
+
+    for category in split_categories:
+        category_name = category.get('displayName')
+        for split in category.get('splits', []):
+            stat = split.get('abbreviation')
+            stats = split.get('stats', [])
+
+            if category_name not in player_splits:
+                player_splits[category_name] = {}
+
+            if stat not in player_splits[category_name]:
+                player_splits[category_name][stat] = {}
+
+            stat_type = "Rec" if split_labels[0].startswith("CAR") else "Rush"
+
+            seen_labels = {}
+            for idx, (label, value) in enumerate(zip(split_labels, stats)):
+                if label in seen_labels:
+                    seen_labels[label] += 1
+                    unique_label = f"{stat_type} {label}"
+                else:
+                    seen_labels[label] = 1
+                    unique_label = label
+                
+                player_splits[category_name][stat][unique_label] = value
+
+    return player_splits
+
+
+def parse_athlete_projections(espn_data):
+    splits = espn_data.get('splits', {})
+    categories = splits.get('categories', [])
+
+    projection_splits = {}
+
+    for category in categories:
+        displayName = category.get('displayName')
+        abbreviation = category.get('abbreviation')
+        stat_projections = category.get('stats', [])
+        
+        if displayName not in projection_splits:
+            projection_splits[displayName] = {}
+
+        for stats in stat_projections:
+            projection_name = stats.get('displayName')
+            short_name = stats.get('shortDisplayName')
+            projection_abv = stats.get('abbreviation')
+            projection_desc = stats.get('description')
+            value = stats.get('value')
+            rank_display = stats.get('rankDisplayValue')
+
+            if rank_display is None or rank_display == '':
+                continue
+
+            if value is None or value == 0.0:
+                continue
+
+            if short_name not in projection_splits[displayName]:
+                projection_splits[displayName][short_name] = {}
+
+                projection_splits[displayName][short_name][projection_desc] = {
+                    projection_abv: {
+                        "value": value,
+                        "rank_display": rank_display
+                    }
+                }
+    return projection_splits
 
+
+def fetch_and_store_athlete(url, athlete_id, season, conditional=True):
+    response = client.get(url, conditional=conditional)
+    now = int(time.time())
+
+    if response.status_code == 304:
+        writer.write([(TOUCH_ATHLETE_SPLITS, [(now, athlete_id, season)])])
+        return None
+
+    if response.status_code == 200:
+        player_splits = parse_athlete_splits(response.json())
+        writer.write(
+            [(STORE_ATHLETE_SPLITS, [(athlete_id, season, json.dumps(player_splits), now)])],
+            tags=[f'athlete:{athlete_id}'],
+        )
         return player_splits
 
-    return {}
+    print(f"Failed to fetch splits for athlete {athlete_id}: {response.status_code}")
+    return None
+
+
+def fetch_and_store_athlete_projections(url, athlete_id, season, conditional=True):
+    response = client.get(url, conditional=conditional)
+    now = int(time.time())
+
+    if response.status_code == 304:
+        writer.write([(TOUCH_ATHLETE_PROJECTIONS, [(now, athlete_id, season)])])
+        return None
 
-def fetch_and_store_athlete_projections(url):
-    response = requests.get(url)
     if response.status_code == 200:
-        espn_data = response.json()
-        splits = espn_data.get('splits', {})
-        categories = splits.get('categories', [])
-
-        projection_splits = {}
-
-        for category in categories:
-            displayName = category.get('displayName')
-            abbreviation = category.get('abbreviation')
-            stat_projections = category.get('stats', [])
-            
-            if displayName not in projection_splits:
-                projection_splits[displayName] = {}
-
-            for stats in stat_projections:
-                projection_name = stats.get('displayName')
-                short_name = stats.get('shortDisplayName')
-                projection_abv = stats.get('abbreviation')
-                projection_desc = stats.get('description')
-                value = stats.get('value')
-                rank_display = stats.get('rankDisplayValue')
-
-                if rank_display is None or rank_display == '':
-                    continue
-
-                if value is None or value == 0.0:
-                    continue
-
-                if short_name not in projection_splits[displayName]:
-                    projection_splits[displayName][short_name] = {}
-
-                    projection_splits[displayName][short_name][projection_desc] = {
-                        projection_abv: {
-                            "value": value,
-                            "rank_display": rank_display
-                        }
-                    }
+        projection_splits = parse_athlete_projections(response.json())
+        writer.write(
+            [(STORE_ATHLETE_PROJECTIONS, [(athlete_id, season, json.dumps(projection_splits), now)])],
+            tags=[f'athlete:{athlete_id}'],
+        )
         return projection_splits
-    return {}
 
+    print(f"Failed to fetch projections for athlete {athlete_id}: {response.status_code}")
+    return None
 
 
-def fetch_and_store_competition_results(url):
-    response = requests.get(url)
-    if response.status_code == 200:
-        espn_data = response.json()
-        events = espn_data.get('events', [])
+def store_competition_results(espn_data, team_id=None):
+    events = espn_data.get('events', [])
+    
+    game_rows = []
+    team_rows = []
+    result_rows = []
+    game_ids = []
+    team_keys = []
+    tags = set()
+
+    for event in events:
+        game_id = event['id']
+        date = event['date']
+        week = event['week']['number']
+        name = event['name']
+        competitors = event['competitions'][0]['competitors']
+
+        team1 = competitors[0]
+        team2 = competitors[1]
         
-        conn = get_database()
-        cursor = conn.cursor()
+        team1_id = team1['team']['id']
+        team2_id = team2['team']['id']
+        team1_name = team1['team']['displayName']
+        team2_name = team2['team']['displayName']
+        team1_logo = team1['team']['logos'][0]['href']
+        team2_logo = team2['team']['logos'][0]['href']
         
-        for event in events:
-            game_id = event['id']
-            date = event['date']
-            week = event['week']['number']
-            name = event['name']
-            competitors = event['competitions'][0]['competitors']
-
-            team1 = competitors[0]
-            team2 = competitors[1]
-            
-            team1_id = team1['team']['id']
-            team2_id = team2['team']['id']
-            team1_name = team1['team']['displayName']
-            team2_name = team2['team']['displayName']
-            team1_logo = team1['team']['logos'][0]['href']
-            team2_logo = team2['team']['logos'][0]['href']
-            
-            team1_score = int(team1['score']['value']) if 'score' in team1 and 'value' in team1['score'] else 0
-            team2_score = int(team2['score']['value']) if 'score' in team2 and 'value' in team2['score'] else 0
-            
-            if team1_score == 0 and team2_score == 0:
-                team1_outcome = 'Pending'
-                team2_outcome = 'Pending'
-            else:
-                team1_outcome = 'W' if team1_score > team2_score else 'L'
-                team2_outcome = 'W' if team2_score > team1_score else 'L'
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO games (
-                    game_id, name, date, week, status
-                ) VALUES (?, ?, ?, ?, ?)
-            ''', (game_id, name, date, week, "Scheduled"))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO teams (
-                    team_id, game_id, team_name, score, abbreviation, logo
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (team1_id, game_id, team1_name, team1_score, team1['team']['abbreviation'], team1_logo))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO teams (
-                    team_id, game_id, team_name, score, abbreviation, logo
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (team2_id, game_id, team2_name, team2_score, team2['team']['abbreviation'], team2_logo))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO competition_results (
-                    game_id, week, competition_date, team_id, team_name, team_logo,
-                    opponent_id, opponent_name, opponent_logo, team_score, opponent_score, outcome
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (game_id, week, date, team1_id, team1_name, team1_logo,
-                  team2_id, team2_name, team2_logo, team1_score, team2_score, team1_outcome))
-
-            cursor.execute('''
-                INSERT OR REPLACE INTO competition_results (
-                    game_id, week, competition_date, team_id, team_name, team_logo,
-                    opponent_id, opponent_name, opponent_logo, team_score, opponent_score, outcome
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (game_id, week, date, team2_id, team2_name, team2_logo,
-                  team1_id, team1_name, team1_logo, team2_score, team1_score, team2_outcome))
-
-        conn.commit()
-        conn.close()
+        team1_score = int(team1['score']['value']) if 'score' in team1 and 'value' in team1['score'] else 0
+        team2_score = int(team2['score']['value']) if 'score' in team2 and 'value' in team2['score'] else 0
+        
+        if team1_score == 0 and team2_score == 0:
+            team1_outcome = 'Pending'
+            team2_outcome = 'Pending'
+        else:
+            team1_outcome = 'W' if team1_score > team2_score else 'L'
+            team2_outcome = 'W' if team2_score > team1_score else 'L'
+
+        game_rows.append((game_id, name, date, week, "Scheduled", cadence.parse_kickoff(date)))
+        game_ids.append(game_id)
+        team_keys += [f'{game_id}:{team1_id}', f'{game_id}:{team2_id}']
+        tags.update([f'game:{game_id}', f'team:{team1_id}', f'team:{team2_id}'])
+
+        team_rows.append((team1_id, game_id, team1_name, team1_score, team1.get('homeAway'), team1['team']['abbreviation'], team1_logo))
+        team_rows.append((team2_id, game_id, team2_name, team2_score, team2.get('homeAway'), team2['team']['abbreviation'], team2_logo))
+
+        result_rows.append((game_id, week, date, team1_id, team1_name, team1_logo,
+                            team2_id, team2_name, team2_logo, team1_score, team2_score, team1_outcome))
+        result_rows.append((game_id, week, date, team2_id, team2_name, team2_logo,
+                            team1_id, team1_name, team1_logo, team2_score, team1_score, team2_outcome))
+
+    schedule_id = team_id or fingerprint(game_ids)
+    new_fingerprints = changed_fingerprints('schedule', {schedule_id: (game_rows, team_rows, result_rows)})
+    if not new_fingerprints:
+        return
+
+    # Only the columns the schedule owns are updated; status, season and the live
+    # fields belong to the scoreboard poll.
+    writer.write([
+        ('''
+            INSERT INTO games (game_id, name, date, week, status, kickoff) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(game_id) DO UPDATE SET
+                name = excluded.name, date = excluded.date, week = excluded.week, kickoff = excluded.kickoff
+        ''', game_rows),
+        ('''
+            INSERT INTO teams (team_id, game_id, team_name, score, home_away, abbreviation, logo) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(team_id, game_id) DO UPDATE SET
+                team_name = excluded.team_name, score = excluded.score, home_away = COALESCE(teams.home_away, excluded.home_away),
+                abbreviation = excluded.abbreviation, logo = excluded.logo
+        ''', team_rows),
+        ('''
+            INSERT OR REPLACE INTO competition_results (
+                game_id, week, competition_date, team_id, team_name, team_logo,
+                opponent_id, opponent_name, opponent_logo, team_score, opponent_score, outcome
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', result_rows),
+        (queries.REFRESH_SCOREBOARD.format(where='WHERE g.game_id = ?'), [(game_id,) for game_id in game_ids]),
+        # The schedule's score can lag the live one, so the next scoreboard poll rewrites these teams.
+        clear_fingerprints('game', game_ids),
+        clear_fingerprints('team', team_keys),
+        save_fingerprints(new_fingerprints),
+    ], tags=tags)
+    # Without this the poll would get a 304 and never look at the cleared fingerprints.
+    client.forget(config.API_URL_ESPN)
 
-def fetch_and_store_team_records(url, team_id):
-    response = requests.get(url)
+def fetch_and_store_competition_results(url):
+    response = client.get(url)
     if response.status_code == 200:
-        espn_data = response.json()
-        items = espn_data.get('items', [])
+        store_competition_results(response.json())
+
+
+def store_team_records(espn_data, team_id):
+    items = espn_data.get('items', [])
+    
+    total_record = next((item for item in items if item['type'] == 'total'), None)
+    if total_record:
+        summary = total_record.get('summary')
+        stats = {stat['name']: stat['value'] for stat in total_record.get('stats', [])}
         
-        total_record = next((item for item in items if item['type'] == 'total'), None)
-        if total_record:
-            summary = total_record.get('summary')
-            stats = {stat['name']: stat['value'] for stat in total_record.get('stats', [])}
-            
-            overall_record = summary
-            win_percentage = stats.get('winPercent')
-            avg_points_for = stats.get('avgPointsFor')
-            avg_points_against = stats.get('avgPointsAgainst')
-            points_for = stats.get('pointsFor')
-            points_against = stats.get('pointsAgainst')
-            point_differential = stats.get('pointDifferential')
-            division_record = stats.get('divisionRecord')
-            division_win_percentage = stats.get('divisionWinPercent')
-            games_played = stats.get('gamesPlayed')
-            playoff_seed = stats.get('playoffSeed')
-            streak = stats.get('streak')
-            
-            conn = get_database()
-            cursor = conn.cursor()
-            cursor.execute("""
+        overall_record = summary
+        win_percentage = stats.get('winPercent')
+        avg_points_for = stats.get('avgPointsFor')
+        avg_points_against = stats.get('avgPointsAgainst')
+        points_for = stats.get('pointsFor')
+        points_against = stats.get('pointsAgainst')
+        point_differential = stats.get('pointDifferential')
+        division_record = stats.get('divisionRecord')
+        division_win_percentage = stats.get('divisionWinPercent')
+        games_played = stats.get('gamesPlayed')
+        playoff_seed = stats.get('playoffSeed')
+        streak = stats.get('streak')
+        
+        record_row = (
+            team_id, overall_record, win_percentage, avg_points_for, avg_points_against, points_for, points_against,
+            point_differential, division_record, division_win_percentage,games_played, playoff_seed, streak
+        )
+        new_fingerprints = changed_fingerprints('record', {team_id: record_row})
+        if not new_fingerprints:
+            return
+
+        writer.write([
+            ("""
                 INSERT OR REPLACE INTO records (
                     team_id, record, win_percentage,avg_points_for, avg_points_against, points_for, points_against,
                     point_differential, division_record, division_win_percentage,
                     games_played, playoff_seed, streak
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                team_id, overall_record, win_percentage, avg_points_for, avg_points_against, points_for, points_against,
-                point_differential, division_record, division_win_percentage,games_played, playoff_seed, streak
-            ))
-            conn.commit()
-            conn.close()
-            print(f"Data for team {team_id} stored successfully.")
+            """, [record_row]),
+            save_fingerprints(new_fingerprints),
+        ], tags=[f'team:{team_id}'])
+        print(f"Data for team {team_id} stored successfully.")
+
+def fetch_and_store_team_records(url, team_id):
+    response = client.get(url)
+    if response.status_code == 200:
+        store_team_records(response.json(), team_id)
+
+
+def changed_game_stats(game_id, rows):
+    columns = ', '.join(stats.COLUMNS)
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(f'SELECT player_id, game_id, team_id, {columns} FROM player_game_stats WHERE game_id = ?', (game_id,))
+    stored = {row[0]: row for row in cursor.fetchall()}
+    return [row for row in rows if stored.get(row[0]) != row]
+
+
+def season_fantasy_leaders(rule_set, season, limit=25):
+    cursor = get_database(readonly=True).cursor()
+    cursor.execute(queries.SEASON_FANTASY_LEADERS, (rule_set, str(season), limit))
+    return cursor.fetchall()
+
+
+def parse_boxscore(espn_data, url):
+    boxscore = espn_data.get('gamepackageJSON', {})
+    boxscore = boxscore.get('boxscore', [])
+    teams = boxscore.get('teams', [])
+    players = boxscore.get('players', [])
+    game_data = espn_data.get('gamepackageJSON', {}).get('game', {})
+    boxscore_id = game_data.get('id', None)
+
+    if boxscore_id is None:
+        from urllib.parse import urlparse, parse_qs
+        parsed_url = urlparse(url)
+        boxscore_id = parse_qs(parsed_url.query).get('gameId', [None])[0]
+
+    team_ids = [team['team']['id'] for team in teams]
+    player_rows = []
+    stat_rows = []
+    typed_by_player = {}
+
+    for team_id in team_ids:
+        for player_group in players:
+            if player_group['team']['id'] == team_id:
+                for category in player_group['statistics']:
+                    category_name = category['name']
+                    keys = category['labels']
+
+                    for athlete in category['athletes']:
+                        player = athlete['athlete']
+                        player_name = player['displayName']
+                        player_id = player['id']
+                        athlete_stats = athlete['stats']
+                        jersey = player.get('jersey', "")
+
+                        player_rows.append((player_id, player_name, player['firstName'], player['lastName'], jersey, team_id))
+
+                        for key, value in zip(keys, athlete_stats):
+                            stat_rows.append((player_id, boxscore_id, team_id, category_name, key, value, jersey))
+
+                        typed = typed_by_player.setdefault((player_id, team_id), {})
+                        typed.update(stats.typed_stats(category_name, keys, athlete_stats))
+
+    game_stats_rows = [
+        stats.game_stats_row(player_id, boxscore_id, team_id, typed)
+        for (player_id, team_id), typed in typed_by_player.items()
+    ]
+    return boxscore_id, team_ids, player_rows, stat_rows, game_stats_rows
+
+
+def boxscore_statements(player_rows, stat_rows, game_stats_rows):
+    return [
+        ("""
+            INSERT OR IGNORE INTO players (player_id, full_name, first_name, last_name, jersey, team_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, player_rows),
+        ("""
+            INSERT INTO player_stats (player_id, game_id, team_id, category, stat_key, stat_value, jersey)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(player_id, game_id, category, stat_key) DO UPDATE SET
+                stat_value = excluded.stat_value,
+                team_id = excluded.team_id,
+                jersey = excluded.jersey
+            WHERE stat_value IS NOT excluded.stat_value
+                OR team_id IS NOT excluded.team_id
+                OR jersey IS NOT excluded.jersey
+        """, stat_rows),
+        (stats.UPSERT_GAME_STATS, game_stats_rows),
+        (scoring.STORE_POINTS, scoring.points_rows(game_stats_rows)),
+    ]
+
 
 def fetch_and_store_boxscore(url):
-    response = requests.get(url)
+    response = client.get(url)
 
     if response.status_code == 200:
-        espn_data = response.json()
-
-        boxscore = espn_data.get('gamepackageJSON', {})
-        boxscore = boxscore.get('boxscore', [])
-        teams = boxscore.get('teams', [])
-        players = boxscore.get('players', [])
-        game_data = espn_data.get('gamepackageJSON', {}).get('game', {})
-        boxscore_id = game_data.get('id', None)
-
-        if boxscore_id is None:
-            from urllib.parse import urlparse, parse_qs
-            parsed_url = urlparse(url)
-            boxscore_id = parse_qs(parsed_url.query).get('gameId', [None])[0]
-
-        conn = get_database()
-        cursor = conn.cursor()
-
-        for team in teams:
-            team_id = team['team']['id']
-
-            for player_group in players:
-                if player_group['team']['id'] == team_id:
-                    for category in player_group['statistics']:
-                        category_name = category['name']
-                        keys = category['labels']
-
-                        for athlete in category['athletes']:
-                            player = athlete['athlete']
-                            player_name = player['displayName']
-                            player_id = player['id']
-                            stats = athlete['stats']
-                            jersey = player.get('jersey', "")
-
-                            cursor.execute("""
-                                INSERT OR IGNORE INTO players (player_id, full_name, first_name, last_name, jersey, team_id)
-                                VALUES (?, ?, ?, ?, ?, ?)
-                            """, (player_id, player_name, player['firstName'], player['lastName'], jersey, team_id))
-
-                            for key, value in zip(keys, stats):
-                                cursor.execute("""
-                                    INSERT INTO player_stats (player_id, game_id, team_id, category, stat_key, stat_value, jersey)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                                    ON CONFLICT(stat_id) DO UPDATE SET stat_value = excluded.stat_value
-                                """, (player_id, boxscore_id, team_id, category_name, key, value, jersey))
-
-        conn.commit()
-        conn.close()
-
-        #test
\ No newline at end of file
+        boxscore_id, team_ids, player_rows, stat_rows, game_stats_rows = parse_boxscore(response.json(), url)
+        game_stats_rows = changed_game_stats(boxscore_id, game_stats_rows)
+
+        writer.write(
+            boxscore_statements(player_rows, stat_rows, game_stats_rows),
+            tags=[f'game:{boxscore_id}'] + [f'team:{team_id}' for team_id in team_ids],
+        )
+
+        #test
@@ -0,0 +1,180 @@
+import contextlib
+import sqlite3
+import threading
+import time
+import backend.config as config
+
+# Histogram buckets in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HELP = {
+    'fantasy_http_request_seconds': 'Time spent handling a request, by route.',
+    'fantasy_template_render_seconds': 'Time spent rendering a template.',
+    'fantasy_upstream_request_seconds': 'Time spent waiting on an upstream API, by host.',
+    'fantasy_sql_seconds': 'Time spent executing SQL, by connection and statement type.',
+    'fantasy_sql_fetch_seconds': 'Time spent stepping through SELECT results in fetchall.',
+    'fantasy_db_write_lock_wait_seconds': 'Time the writer thread waited for the database write lock.',
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_noop = contextlib.nullcontext()
+
+
+def observe(name, seconds, **labels):
+    if not config.METRICS_ENABLED:
+        return
+
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        counts = histogram[0]
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                counts[index] += 1
+                break
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+@contextlib.contextmanager
+def _span(name, labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def span(name, **labels):
+    if not config.METRICS_ENABLED:
+        return _noop
+    return _span(name, labels)
+
+
+def _statement(sql):
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ''
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        with _span('fantasy_sql_seconds', {'db': self.connection.role, 'statement': _statement(sql)}):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with _span('fantasy_sql_seconds', {'db': self.connection.role, 'statement': _statement(sql)}):
+            return super().executemany(sql, seq_of_parameters)
+
+    def fetchall(self):
+        with _span('fantasy_sql_fetch_seconds', {'db': self.connection.role}):
+            return super().fetchall()
+
+
+class TimedConnection(sqlite3.Connection):
+    # Only used when metrics are enabled, see functions._connect.
+    role = 'db'
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def init_app(app):
+    if not config.METRICS_ENABLED:
+        return
+
+    from flask import before_render_template, g, request, template_rendered
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.teardown_request
+    def stop_request_timer(exc):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            observe('fantasy_http_request_seconds', time.perf_counter() - started, route=route)
+
+    def template_started(sender, template, context, **extra):
+        g.setdefault('metrics_templates', {})[template.name] = time.perf_counter()
+
+    def template_finished(sender, template, context, **extra):
+        started = g.get('metrics_templates', {}).pop(template.name, None)
+        if started is not None:
+            observe('fantasy_template_render_seconds', time.perf_counter() - started, template=template.name)
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    return repr(float(value))
+
+
+def render(cache_stats=None, writer_metrics=None, ingest_status=None):
+    lines = []
+
+    with _lock:
+        histograms = sorted((key, [list(h[0]), h[1], h[2]]) for key, h in _histograms.items())
+
+    described = set()
+    for (name, pairs), (counts, total, count) in histograms:
+        if name not in described:
+            described.add(name)
+            lines.append(f'# HELP {name} {HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} histogram')
+
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, counts):
+            cumulative += bucket
+            lines.append(f'{name}_bucket{_labels(pairs + (("le", repr(float(bound))),))} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(pairs + (("le", "+Inf"),))} {count}')
+        lines.append(f'{name}_sum{_labels(pairs)} {total!r}')
+        lines.append(f'{name}_count{_labels(pairs)} {count}')
+
+    def gauge(name, value, help_text, kind='gauge'):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {_number(value)}')
+
+    if cache_stats is not None:
+        gauge('fantasy_page_cache_hit_ratio', cache_stats.get('hit_ratio'), 'Share of page cache lookups served from the cache, stale hits included.')
+        gauge('fantasy_page_cache_hits_total', cache_stats.get('hits', 0), 'Fresh page cache hits.', 'counter')
+        gauge('fantasy_page_cache_stale_hits_total', cache_stats.get('stale_hits', 0), 'Expired entries served while another worker refreshes them.', 'counter')
+        gauge('fantasy_page_cache_misses_total', cache_stats.get('misses', 0), 'Page cache misses.', 'counter')
+        gauge('fantasy_page_cache_entries', cache_stats.get('entries', 0), 'Entries in the page cache.')
+
+    if writer_metrics is not None:
+        lock_wait = writer_metrics.get('max_lock_wait_ms')
+        gauge('fantasy_db_write_queue_depth', writer_metrics.get('queue_depth'), 'Write batches waiting for the writer thread.')
+        gauge('fantasy_db_write_lock_wait_max_seconds', lock_wait / 1000 if lock_wait is not None else None, 'Longest wait for the database write lock.')
+        gauge('fantasy_db_write_batches_total', writer_metrics.get('batches', 0), 'Write batches committed.', 'counter')
+        gauge('fantasy_db_write_rows_total', writer_metrics.get('rows', 0), 'Rows changed by the writer thread.', 'counter')
+        gauge('fantasy_db_write_failures_total', writer_metrics.get('failures', 0), 'Write batches rolled back.', 'counter')
+
+    if ingest_status is not None:
+        gauge('fantasy_ingest_age_seconds', ingest_status.get('age_seconds'), 'Seconds since the scoreboard was last refreshed.')
+        gauge('fantasy_ingest_consecutive_failures', ingest_status.get('consecutive_failures', 0), 'Scoreboard refreshes failed in a row.')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,202 @@
+import backend.stats as stats
+
+# One row per game with both sides, kept in step with games and teams by the scoreboard ingest.
+REFRESH_SCOREBOARD = '''
+    INSERT OR REPLACE INTO scoreboard (
+        game_id, season, season_type, week, name, date, kickoff, status, clock, period, down, detailed_text,
+        home_team_id, home_name, home_score, home_abbreviation, home_logo,
+        away_team_id, away_name, away_score, away_abbreviation, away_logo
+    )
+    SELECT
+        g.game_id, g.year, g.season_id, g.week, g.name, g.date, g.kickoff, g.status, g.clock, g.period, g.down, g.detailed_text,
+        h.team_id, h.team_name, h.score, h.abbreviation, h.logo,
+        a.team_id, a.team_name, a.score, a.abbreviation, a.logo
+    FROM games g
+    JOIN teams h ON h.game_id = g.game_id AND h.home_away = 'home'
+    JOIN teams a ON a.game_id = g.game_id AND a.home_away = 'away'
+    {where}
+'''
+
+# Column order matches the tuples home.html indexes into.
+HOME_SCOREBOARD = '''
+    SELECT
+        s.game_id, s.name, s.status, s.clock,
+        s.home_team_id, s.home_name, s.home_score, s.home_abbreviation, s.home_logo,
+        s.away_team_id, s.away_name, s.away_score, s.away_abbreviation, s.away_logo,
+        s.period, s.week, s.down, s.detailed_text, s.kickoff
+    FROM current_week
+    JOIN scoreboard s
+        ON s.season = current_week.season AND s.season_type = current_week.season_type AND s.week = current_week.week
+    ORDER BY s.kickoff, s.game_id
+'''
+
+GAME_DETAIL = 'SELECT game_id, name, status, clock, down, detailed_text, year, season_id FROM games WHERE game_id = ?'
+
+GAME_TEAMS = 'SELECT team_name, score, abbreviation, logo, team_id FROM teams WHERE game_id = ?'
+
+GAME_PLAYER_STATS = '''
+    SELECT p.full_name, ps.category, ps.stat_key, ps.stat_value, t.team_name
+    FROM player_stats ps
+    JOIN players p ON ps.player_id = p.player_id
+    JOIN teams t ON ps.team_id = t.team_id AND ps.game_id = t.game_id
+    LEFT JOIN player_game_stats g ON g.player_id = ps.player_id AND g.game_id = ps.game_id
+    WHERE ps.game_id = ? AND t.team_id = ?
+    ORDER BY
+        CASE ps.category {category_order} ELSE {category_count} END,
+        CASE ps.category {sort_columns} END DESC,
+        ps.player_id,
+        ps.stat_id
+'''.format(
+    category_order=' '.join(f"WHEN '{category}' THEN {index}" for index, category in enumerate(stats.STAT_COLUMNS)),
+    category_count=len(stats.STAT_COLUMNS),
+    sort_columns=' '.join(f"WHEN '{category}' THEN g.{column}" for category, column in stats.SORT_COLUMNS.items()),
+)
+
+TEAM_ATHLETE_URLS = 'SELECT DISTINCT athlete_url FROM depthChart WHERE team_id = ? AND athlete_url IS NOT NULL'
+
+FRESH_ATHLETE_URLS = 'SELECT athlete_url FROM athletes WHERE team_id = ? AND fetched_at >= ?'
+
+# The season of the last scoreboard poll, or of the league info if no week is stored yet.
+CURRENT_SEASON = '''
+    SELECT COALESCE(
+        (SELECT season FROM current_week WHERE id = 1),
+        (SELECT CAST(MAX(year) AS INTEGER) FROM leagueInfo)
+    )
+'''
+
+TEAM_INFO = 'SELECT team_id, team_name, abbreviation, logo FROM teams WHERE team_id = ?'
+
+TEAM_RECORD = 'SELECT * FROM records WHERE team_id = ?'
+
+TEAM_LOGO = 'SELECT logo FROM teams WHERE team_id = ?'
+
+TEAM_SCHEDULE = '''
+    SELECT
+        g.name, g.week, g.kickoff, g.status,
+        t1.abbreviation AS team1_abbr, t1.score AS team1_score,
+        t2.abbreviation AS team2_abbr, t2.score AS team2_score,
+        COALESCE(r1.outcome, 'Unknown') AS team1_outcome, t1.logo AS team1_logo, t2.logo AS team2_logo,
+        t1.team_id AS team1_id, t2.team_id AS team2_id, g.game_id
+    FROM games g
+    LEFT JOIN teams t1 ON g.game_id = t1.game_id
+    LEFT JOIN competition_results r1 ON r1.team_id = t1.team_id AND r1.game_id = g.game_id
+    LEFT JOIN teams t2 ON g.game_id = t2.game_id AND t1.team_id != t2.team_id
+    WHERE t1.team_id = ?
+    GROUP BY g.game_id
+    ORDER BY g.kickoff ASC
+'''
+
+TEAM_DEPTH_CHART = '''
+    SELECT DISTINCT
+        d.position_category,
+        d.position_abbreviation,
+        d.slot,
+        d.rank,
+        a.player_name,
+        a.jersey,
+        a.headshot,
+        a.position_name,
+        a.position_abv,
+        a.slug,
+        a.shortName,
+        a.athlete_id,
+        a.team_id,
+        a.player_status
+    FROM depthChart d
+    LEFT JOIN athletes a
+        ON d.athlete_url = a.athlete_url
+        AND d.team_id = a.team_id
+    WHERE d.team_id = ?
+    ORDER BY a.position_name DESC, d.position_category, d.rank ASC
+'''
+
+PLAYER_TEAM = TEAM_INFO
+
+PLAYER_ATHLETE = 'SELECT athlete_id, player_name, weight, height, age, dob, headshot, jersey, position_abv, statistics_url, projections_url, player_status FROM athletes WHERE slug = ?'
+
+GAME_FANTASY_LEADERS = '''
+    SELECT p.full_name, f.points
+    FROM fantasy_points f
+    JOIN players p ON f.player_id = p.player_id
+    WHERE f.game_id = ? AND f.rule_set = ? AND f.team_id = ?
+    ORDER BY f.points DESC
+    LIMIT ?
+'''
+
+SEASON_FANTASY_LEADERS = '''
+    SELECT f.player_id, p.full_name, SUM(f.points) AS points, COUNT(*) AS games
+    FROM games g
+    JOIN fantasy_points f ON f.game_id = g.game_id AND f.rule_set = ?
+    JOIN players p ON f.player_id = p.player_id
+    WHERE g.year = ?
+    GROUP BY f.player_id
+    ORDER BY points DESC
+    LIMIT ?
+'''
+
+PLAYER_SPLITS = 'SELECT splits, fetched_at FROM athlete_splits WHERE athlete_id = ? AND season = ?'
+
+PLAYER_PROJECTIONS = 'SELECT projections, fetched_at FROM athlete_projections WHERE athlete_id = ? AND season = ?'
+
+# JSON API, see backend/api.py. {tags} and {game_ids} are filled with one ? per value.
+API_VERSIONS = 'SELECT tag, version FROM data_versions WHERE tag IN ({tags})'
+
+CURRENT_WEEK_GAME_IDS = '''
+    SELECT s.game_id
+    FROM current_week
+    JOIN scoreboard s
+        ON s.season = current_week.season AND s.season_type = current_week.season_type AND s.week = current_week.week
+    ORDER BY s.kickoff, s.game_id
+'''
+
+API_WEEK_GAME_IDS = 'SELECT game_id FROM scoreboard WHERE season = ? AND season_type = ? AND week = ? ORDER BY game_id'
+
+API_SEASON_GAME_IDS = 'SELECT game_id FROM games WHERE year = ? AND game_id > ? ORDER BY game_id LIMIT ?'
+
+API_GAMES = '''
+    SELECT
+        g.game_id, g.name, g.kickoff, g.year, g.season_id, g.week, g.status, g.clock, g.period, g.down, g.detailed_text,
+        t.team_id, t.team_name, t.abbreviation, t.logo, t.score, t.home_away
+    FROM games g
+    JOIN teams t ON t.game_id = g.game_id
+    WHERE g.game_id IN ({game_ids})
+    ORDER BY g.game_id, t.home_away DESC
+'''
+
+API_GAME_PLAYERS = '''
+    SELECT s.player_id, p.full_name, s.team_id, {columns}
+    FROM player_game_stats s
+    JOIN players p ON p.player_id = s.player_id
+    WHERE s.game_id = ?
+    ORDER BY s.team_id, s.player_id
+'''.format(columns=', '.join(f's.{column}' for column in stats.COLUMNS))
+
+GAMES_BETWEEN = 'SELECT game_id, status, clock, kickoff FROM games WHERE kickoff BETWEEN ? AND ? ORDER BY kickoff, game_id'
+
+# Every query a route runs, with sample parameters for EXPLAIN QUERY PLAN.
+ROUTE_QUERIES = {
+    'home: scoreboard': (HOME_SCOREBOARD, ()),
+    'game: detail': (GAME_DETAIL, ('0',)),
+    'game: teams': (GAME_TEAMS, ('0',)),
+    'game: player stats': (GAME_PLAYER_STATS, ('0', '0')),
+    'game: fantasy leaders': (GAME_FANTASY_LEADERS, ('0', 'ppr', '0', 5)),
+    'team: athlete urls': (TEAM_ATHLETE_URLS, ('0',)),
+    'team: fresh athletes': (FRESH_ATHLETE_URLS, ('0', 0)),
+    'current season': (CURRENT_SEASON, ()),
+    'team: info': (TEAM_INFO, ('0',)),
+    'team: record': (TEAM_RECORD, ('0',)),
+    'team: logo': (TEAM_LOGO, ('0',)),
+    'team: schedule': (TEAM_SCHEDULE, ('0',)),
+    'team: depth chart': (TEAM_DEPTH_CHART, ('0',)),
+    'player: team': (PLAYER_TEAM, ('0',)),
+    'player: athlete': (PLAYER_ATHLETE, ('',)),
+    'player: splits': (PLAYER_SPLITS, ('0', 0)),
+    'player: projections': (PLAYER_PROJECTIONS, ('0', 0)),
+    'api: versions': (API_VERSIONS.format(tags='?'), ('ingest',)),
+    'current week game ids': (CURRENT_WEEK_GAME_IDS, ()),
+    'api: week game ids': (API_WEEK_GAME_IDS, (0, 2, 1)),
+    'api: season game ids': (API_SEASON_GAME_IDS, (0, '', 50)),
+    'api: games': (API_GAMES.format(game_ids='?'), ('0',)),
+    'api: games between': (GAMES_BETWEEN, (0, 0)),
+    'api: game players': (API_GAME_PLAYERS, ('0',)),
+}
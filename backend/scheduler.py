@@ -0,0 +1,277 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import socket
+import threading
+import time
+import backend.config as config
+import backend.functions as functions
+import backend.writer as writer
+import backend.cadence as cadence
+import backend.sleeper as sleeper
+import backend.crosswalk as crosswalk
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_thread = None
+_watched_games = set()
+_finished_boxscores = set()
+_next_poll = config.INGEST_INTERVAL
+_background = ThreadPoolExecutor(max_workers=config.BACKGROUND_WORKERS, thread_name_prefix='background-refresh')
+_pending = set()
+_players_checked = 0
+_owner = f'{socket.gethostname()}:{os.getpid()}'
+_leader = False
+
+# Only one process polls ESPN. The lease is renewed while its holder is alive and
+# taken over once it has lapsed.
+TAKE_LEASE = '''
+    INSERT INTO ingest_lease (id, owner, expires_at) VALUES (1, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+    WHERE ingest_lease.owner = excluded.owner OR ingest_lease.expires_at < ?
+'''
+
+SAVE_STATUS = 'UPDATE ingest_lease SET status = ? WHERE id = 1 AND owner = ?'
+
+SHARED_STATUS = ('last_refresh', 'last_attempt', 'last_error', 'consecutive_failures', 'next_poll_seconds', 'rows_touched')
+
+_status = {
+    'last_refresh': None,
+    'last_attempt': None,
+    'last_error': None,
+    'consecutive_failures': 0,
+    'next_poll_seconds': None,
+    'rows_touched': None,
+    'running': False,
+}
+
+
+def take_lease():
+    global _leader
+
+    now = time.time()
+    leader = writer.write([(TAKE_LEASE, [(_owner, now + config.INGEST_LEASE, now)])]) > 0
+    with _lock:
+        _leader = leader
+    return leader
+
+
+def _save_status():
+    with _lock:
+        status = {key: _status[key] for key in SHARED_STATUS}
+    writer.write([(SAVE_STATUS, [(json.dumps(status), _owner)])])
+
+
+def _leader_status():
+    cursor = functions.get_database(readonly=True).cursor()
+    cursor.execute('SELECT status FROM ingest_lease WHERE id = 1')
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row and row[0] else {}
+
+
+def get_status():
+    with _lock:
+        status = dict(_status)
+        leader = _leader
+
+    # Pages rendered by a process that is not polling show the poller's progress.
+    if not leader:
+        status.update(_leader_status())
+
+    if status['last_refresh']:
+        status['age_seconds'] = int(time.time() - status['last_refresh'])
+    else:
+        status['age_seconds'] = None
+
+    expected_age = status['next_poll_seconds'] or config.POLL_FINAL_RECHECK
+    status['stale'] = (
+        status['age_seconds'] is None
+        or status['age_seconds'] > expected_age + config.INGEST_STALE_AFTER
+        or status['consecutive_failures'] > 0
+    )
+    status['last_refresh_display'] = (
+        datetime.fromtimestamp(status['last_refresh']).strftime('%I:%M:%S %p')
+        if status['last_refresh'] else None
+    )
+    return status
+
+
+def run_once():
+    global _next_poll
+
+    with _lock:
+        _status['last_attempt'] = time.time()
+
+    try:
+        result = functions.fetch_and_store_live_data()
+        if result is None:
+            raise RuntimeError('scoreboard request did not return data')
+        slate, rows_touched = result
+    except Exception as e:
+        print(f"Scoreboard refresh failed: {e}")
+        with _lock:
+            _status['last_error'] = str(e)
+            _status['consecutive_failures'] += 1
+        return False
+
+    conn = functions.get_database(readonly=True)
+    games = cadence.load_games(conn, slate)
+    now = time.time()
+    next_poll = cadence.plan_scoreboard(games, now)
+    if next_poll is None:
+        # The slate is over; wake up for the next stored kickoff instead of the fixed recheck.
+        upcoming = cadence.upcoming_games(conn, now, config.POLL_FINAL_RECHECK)
+        if upcoming:
+            next_poll = cadence.plan_scoreboard(upcoming[:1], now)
+
+    with _lock:
+        _status['last_refresh'] = time.time()
+        _status['last_error'] = None
+        _status['consecutive_failures'] = 0
+        _status['rows_touched'] = rows_touched
+        _next_poll = next_poll
+        _status['next_poll_seconds'] = _next_poll
+        due = cadence.plan_boxscores(games, _finished_boxscores)
+        due += [game_id for game_id in _watched_games if game_id not in slate and game_id not in _finished_boxscores]
+
+    states = {game_id: state for game_id, state, _ in games}
+    for game_id in due:
+        try:
+            functions.fetch_and_store_boxscore(functions.boxscore_url(game_id))
+        except Exception as e:
+            print(f"Boxscore refresh for game {game_id} failed: {e}")
+            continue
+
+        if states.get(game_id, 'final') == 'final':
+            with _lock:
+                _finished_boxscores.add(game_id)
+    return True
+
+
+def _next_delay():
+    with _lock:
+        failures = _status['consecutive_failures']
+        next_poll = _next_poll
+
+    if failures:
+        return min(config.INGEST_INTERVAL * (2 ** failures), config.INGEST_MAX_BACKOFF)
+    if next_poll is None:
+        return config.POLL_FINAL_RECHECK
+    return next_poll
+
+
+def refresh_players():
+    global _players_checked
+
+    now = time.time()
+    with _lock:
+        if now - _players_checked < config.SLEEPER_REFRESH:
+            return False
+        _players_checked = now
+
+    # load_players itself skips the download if another process loaded the dump recently.
+    return refresh_later(('sleeper players',), _load_players)
+
+
+def _load_players():
+    sleeper.load_players()
+    # Runs even when the dump was unchanged: ESPN rosters loaded since may match players that did not before.
+    crosswalk.update()
+
+
+def _refresh_watched():
+    # The poller fetches box scores for its own slate; watched games outside it are
+    # fetched by whichever process a viewer opened them in.
+    slate = set(functions.current_game_ids())
+    with _lock:
+        due = [game_id for game_id in _watched_games if game_id not in slate and game_id not in _finished_boxscores]
+
+    for game_id in due:
+        try:
+            functions.fetch_and_store_boxscore(functions.boxscore_url(game_id))
+        except Exception as e:
+            print(f"Boxscore refresh for game {game_id} failed: {e}")
+            continue
+        with _lock:
+            _finished_boxscores.add(game_id)
+
+
+def _loop():
+    next_run = 0
+    while True:
+        try:
+            leader = take_lease()
+        except Exception as e:
+            print(f"Ingestion lease check failed: {e}")
+            leader = False
+
+        if leader and time.time() >= next_run:
+            run_once()
+            refresh_players()
+            _save_status()
+            next_run = time.time() + _next_delay()
+        elif not leader:
+            _refresh_watched()
+
+        # Wake up at least twice per lease to renew it, or to take it over from a poller that stopped.
+        wait = config.INGEST_LEASE / 2
+        if leader:
+            wait = max(0, min(next_run - time.time(), wait))
+        if _wakeup.wait(wait):
+            next_run = 0
+        _wakeup.clear()
+
+
+def refresh_now():
+    _wakeup.set()
+
+
+def watch_game(game_id):
+    with _lock:
+        is_new = game_id not in _watched_games
+        _watched_games.add(game_id)
+
+    if is_new:
+        refresh_now()
+
+
+def _run_pending(key, fn, args):
+    try:
+        fn(*args)
+    except Exception as e:
+        print(f"Background refresh {key} failed: {e}")
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def refresh_later(key, fn, *args):
+    with _lock:
+        if key in _pending:
+            return False
+        _pending.add(key)
+
+    _background.submit(_run_pending, key, fn, args)
+    return True
+
+
+def start():
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name='ingestion-scheduler', daemon=True)
+        _status['running'] = True
+
+    _thread.start()
+
+
+if __name__ == '__main__':
+    import database
+
+    # Polls on its own, for deployments whose web workers run with FANTASY_INGEST=0.
+    database.init()
+    start()
+    _thread.join()
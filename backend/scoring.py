@@ -0,0 +1,75 @@
+import backend.config as config
+import backend.stats as stats
+
+# Points per unit of each player_game_stats column.
+STANDARD = {
+    'pass_yds': 0.04,
+    'pass_td': 4,
+    'pass_int': -2,
+    'rush_yds': 0.1,
+    'rush_td': 6,
+    'rec_yds': 0.1,
+    'rec_td': 6,
+    'fumbles_lost': -2,
+    'kick_return_td': 6,
+    'punt_return_td': 6,
+    'fg_made': 3,
+    'xp_made': 1,
+}
+
+RULE_SETS = {
+    'standard': STANDARD,
+    'half_ppr': {**STANDARD, 'rec': 0.5},
+    'ppr': {**STANDARD, 'rec': 1},
+}
+
+STORE_POINTS = '''
+    INSERT INTO fantasy_points (player_id, game_id, rule_set, team_id, points)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(player_id, game_id, rule_set) DO UPDATE SET
+        team_id = excluded.team_id,
+        points = excluded.points
+    WHERE team_id IS NOT excluded.team_id OR points IS NOT excluded.points
+'''
+
+
+def rule_sets():
+    sets = dict(RULE_SETS)
+    if config.CUSTOM_SCORING:
+        sets['custom'] = {**STANDARD, **config.CUSTOM_SCORING}
+    return sets
+
+
+def score(typed, rules):
+    return round(sum(points * (typed.get(column) or 0) for column, points in rules.items()), 2)
+
+
+def points_rows(game_stats_rows):
+    # game_stats_rows are stats.game_stats_row tuples: player, game, team, then stats.COLUMNS.
+    sets = rule_sets()
+    rows = []
+    for row in game_stats_rows:
+        player_id, game_id, team_id = row[:3]
+        typed = dict(zip(stats.COLUMNS, row[3:]))
+        for name, rules in sets.items():
+            rows.append((player_id, game_id, name, team_id, score(typed, rules)))
+    return rows
+
+
+def rescore(conn):
+    columns = ', '.join(stats.COLUMNS)
+    rows = conn.execute(f'SELECT player_id, game_id, team_id, {columns} FROM player_game_stats').fetchall()
+    names = list(rule_sets())
+    placeholders = ','.join('?' for _ in names)
+    conn.execute(f'DELETE FROM fantasy_points WHERE rule_set NOT IN ({placeholders})', names)
+    conn.executemany(STORE_POINTS, points_rows(rows))
+    return len(rows)
+
+
+if __name__ == '__main__':
+    # Recompute every stored score, e.g. after changing CUSTOM_SCORING in config.py.
+    import backend.functions as functions
+
+    conn = functions.get_database()
+    with conn:
+        print(f"Rescored {rescore(conn)} player games")
@@ -0,0 +1,251 @@
+import argparse
+import codecs
+import hashlib
+import json
+import sys
+import tempfile
+import time
+import backend.client as client
+import backend.config as config
+import backend.fixtures as fixtures
+import backend.functions as functions
+import backend.writer as writer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Sleeper's /players/nfl is one JSON object keyed by player id, several megabytes
+# long. It is spooled to a temporary file while it is hashed, skipped when the
+# hash matches the last load, and otherwise parsed one player at a time so only
+# a single write batch is held in memory.
+
+COLUMNS = (
+    'player_id', 'full_name', 'first_name', 'last_name', 'search_full_name', 'position', 'fantasy_positions',
+    'team', 'number', 'status', 'active', 'injury_status', 'age', 'birth_date', 'years_exp',
+    'height', 'weight', 'college', 'depth_chart_order', 'espn_id', 'yahoo_id',
+)
+
+# Only rows whose values differ are rewritten, so the rowcount is the number of players that changed.
+UPSERT_PLAYERS = '''
+    INSERT INTO sleeper_players ({columns}) VALUES ({placeholders})
+    ON CONFLICT(player_id) DO UPDATE SET {updates}
+    WHERE ({current}) IS NOT ({excluded})
+'''.format(
+    columns=', '.join(COLUMNS),
+    placeholders=', '.join('?' for _ in COLUMNS),
+    updates=', '.join(f'{column} = excluded.{column}' for column in COLUMNS[1:]),
+    current=', '.join(COLUMNS[1:]),
+    excluded=', '.join(f'excluded.{column}' for column in COLUMNS[1:]),
+)
+
+RECORD_DUMP = '''
+    INSERT INTO sleeper_dumps (loaded_at, digest, players, rows, seconds, peak_rss_kb)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+
+def _skip_whitespace(text, position):
+    while position < len(text) and text[position] in ' \t\n\r':
+        position += 1
+    return position
+
+
+def iter_object(chunks):
+    # Yields the (key, value) pairs of a top-level JSON object from an iterable of byte chunks.
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    opened = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + utf8.decode(chunk)
+        position = 0
+
+        if not opened:
+            position = _skip_whitespace(buffer, position)
+            if position == len(buffer):
+                continue
+            if buffer[position] != '{':
+                raise ValueError('Expected a JSON object')
+            position += 1
+            opened = True
+
+        while True:
+            start = _skip_whitespace(buffer, position)
+            if start < len(buffer) and buffer[start] == '}':
+                return
+
+            # A pair is taken only once the delimiter after it has arrived, so a value
+            # cut off at a chunk boundary is never decoded early.
+            try:
+                key, end = decoder.raw_decode(buffer, start)
+                end = _skip_whitespace(buffer, end)
+                if buffer[end] != ':':
+                    raise ValueError(f'Expected ":" after key {key!r}')
+                value, end = decoder.raw_decode(buffer, _skip_whitespace(buffer, end + 1))
+                end = _skip_whitespace(buffer, end)
+                delimiter = buffer[end]
+            except (json.JSONDecodeError, IndexError):
+                break
+
+            if delimiter not in ',}':
+                raise ValueError(f'Expected "," or "}}" after player {key!r}')
+
+            yield key, value
+            position = end + 1
+            if delimiter == '}':
+                return
+
+    raise ValueError('Player dump ended before the closing brace')
+
+
+def player_row(player_id, player):
+    first_name = player.get('first_name')
+    last_name = player.get('last_name')
+    full_name = player.get('full_name') or ' '.join(name for name in (first_name, last_name) if name) or None
+    active = player.get('active')
+    espn_id = player.get('espn_id')
+    yahoo_id = player.get('yahoo_id')
+
+    return (
+        player_id,
+        full_name,
+        first_name,
+        last_name,
+        player.get('search_full_name'),
+        player.get('position'),
+        ','.join(player.get('fantasy_positions') or []) or None,
+        player.get('team'),
+        player.get('number'),
+        player.get('status'),
+        int(active) if active is not None else None,
+        player.get('injury_status'),
+        player.get('age'),
+        player.get('birth_date'),
+        player.get('years_exp'),
+        player.get('height'),
+        player.get('weight'),
+        player.get('college'),
+        player.get('depth_chart_order'),
+        str(espn_id) if espn_id is not None else None,
+        str(yahoo_id) if yahoo_id is not None else None,
+    )
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def last_loaded():
+    cursor = functions.get_database(readonly=True).cursor()
+    cursor.execute('SELECT MAX(loaded_at) FROM sleeper_dumps')
+    return cursor.fetchone()[0]
+
+
+def _read_chunks(f):
+    return iter(lambda: f.read(config.SLEEPER_CHUNK), b'')
+
+
+def _spool(chunks, spool):
+    digest = hashlib.sha1()
+    for chunk in chunks:
+        digest.update(chunk)
+        if spool is not None:
+            spool.write(chunk)
+    return digest.hexdigest()
+
+
+def _unchanged(digest):
+    known = functions.load_fingerprints(functions.get_database(readonly=True).cursor(), 'sleeper')
+    if known.get('players') != digest:
+        return False
+
+    print("Sleeper player dump unchanged, skipping")
+    writer.write([(RECORD_DUMP, [(int(time.time()), digest, 0, 0, 0.0, peak_rss_kb())])])
+    return True
+
+
+def store_players(chunks, digest):
+    started = time.perf_counter()
+    players = 0
+    rows = 0
+    batch = []
+
+    for player_id, player in iter_object(chunks):
+        batch.append(player_row(player_id, player))
+        players += 1
+        if len(batch) >= config.SLEEPER_BATCH:
+            rows += writer.write([(UPSERT_PLAYERS, batch)], tags=['sleeper'])
+            batch = []
+
+    rows += writer.write([(UPSERT_PLAYERS, batch)], tags=['sleeper'])
+
+    # The dump fingerprint is only saved once every batch is in, so a failed load is retried in full.
+    seconds = time.perf_counter() - started
+    peak = peak_rss_kb()
+    writer.write([
+        functions.save_fingerprints([('sleeper', 'players', digest)]),
+        (RECORD_DUMP, [(int(time.time()), digest, players, rows, seconds, peak)]),
+    ])
+    print(f"Loaded {players} Sleeper players, {rows} changed, in {seconds:.1f}s "
+          f"({players / seconds if seconds else 0:.0f} players/s, peak RSS {peak or 0} KB)")
+    return rows
+
+
+def load_players(force=False):
+    if not force:
+        loaded_at = last_loaded()
+        if loaded_at and time.time() - loaded_at < config.SLEEPER_REFRESH:
+            return 0
+
+    response = client.get(config.API_URL_PLAYERS, stream=True)
+    if response.status_code == 304:
+        print("Sleeper player dump not modified")
+        return 0
+    if response.status_code != 200:
+        print(f"Failed to fetch Sleeper players: {response.status_code}")
+        return None
+
+    with response, tempfile.TemporaryFile() as spool:
+        digest = _spool(response.iter_content(config.SLEEPER_CHUNK), spool)
+        spool.seek(0)
+
+        if config.UPSTREAM_RECORD:
+            fixtures.save_file(config.UPSTREAM_RECORD, config.API_URL_PLAYERS, spool)
+            spool.seek(0)
+
+        if not force and _unchanged(digest):
+            return 0
+        return store_players(_read_chunks(spool), digest)
+
+
+def load_file(path, force=False):
+    with open(path, 'rb') as f:
+        digest = _spool(_read_chunks(f), None)
+        if not force and _unchanged(digest):
+            return 0
+
+        f.seek(0)
+        return store_players(_read_chunks(f), digest)
+
+
+if __name__ == '__main__':
+    import database
+
+    parser = argparse.ArgumentParser(description="Load Sleeper's full NFL player dump into sleeper_players.")
+    parser.add_argument('--file', help='load a saved dump instead of fetching it')
+    parser.add_argument('--force', action='store_true', help='load even if the dump has not changed')
+    args = parser.parse_args()
+
+    database.init()
+    if args.file:
+        load_file(args.file, args.force)
+    else:
+        load_players(args.force)
@@ -0,0 +1,207 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from flask_caching.backends.base import BaseCache
+
+
+class SQLiteCache(BaseCache):
+    # Shared by every worker process on the host. Entries are evicted least
+    # recently used once the table grows past `threshold`. When an entry
+    # expires, the first reader takes a short lease and recomputes it while
+    # everyone else keeps getting the stale value. get_or_lease does the same
+    # for a missing entry, and for one its caller considers out of date.
+
+    def __init__(self, path, threshold=500, default_timeout=300, lease_seconds=30, touch_interval=10, lease_poll=0.05):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.lease_seconds = lease_seconds
+        self.touch_interval = touch_interval
+        self.lease_poll = lease_poll
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'stale_hits': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                expires REAL,
+                accessed REAL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed)')
+        conn.execute('CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, until REAL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+        conn.commit()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            path=config['CACHE_SQLITE_PATH'],
+            threshold=config.get('CACHE_THRESHOLD', 500),
+        )
+        return cls(*args, **kwargs)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else None
+
+    def _count(self, name):
+        with self._counter_lock:
+            self._counters[name] += 1
+            pending = sum(self._counters.values())
+            if pending < 100:
+                return
+            counters = self._counters
+            self._counters = {key: 0 for key in counters}
+
+        self._connection().executemany("""
+            INSERT INTO counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """, list(counters.items()))
+
+    def _take_lease(self, conn, key, now):
+        cursor = conn.execute("""
+            INSERT INTO leases (key, until) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET until = excluded.until
+            WHERE leases.until < ?
+        """, (key, now + self.lease_seconds, now))
+        return cursor.rowcount == 1
+
+    def get(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            if self._take_lease(conn, key, now):
+                self._count('misses')
+                return None
+            self._count('stale_hits')
+            return pickle.loads(value)
+
+        self._touch(conn, key, accessed, now)
+        self._count('hits')
+        return pickle.loads(value)
+
+    def _touch(self, conn, key, accessed, now):
+        if accessed is None or now - accessed > self.touch_interval:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+
+    def get_or_lease(self, key, stale=None):
+        # Returns (value, leased). A leased caller should recompute the value and set()
+        # it. An entry that is missing, expired or rejected by stale(value) is leased to
+        # one caller at a time; the others get the old value, or when there is none,
+        # wait up to lease_seconds for the leaseholder to set one.
+        conn = self._connection()
+        deadline = time.time() + self.lease_seconds
+
+        while True:
+            now = time.time()
+            row = conn.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+            value = pickle.loads(row[0]) if row is not None else None
+
+            if row is not None and (row[1] is None or row[1] > now) and not (stale and stale(value)):
+                self._touch(conn, key, row[2], now)
+                self._count('hits')
+                return value, False
+
+            if self._take_lease(conn, key, now):
+                self._count('misses')
+                return value, True
+
+            if row is not None:
+                self._count('stale_hits')
+                return value, False
+
+            if now >= deadline:
+                self._count('misses')
+                return None, True
+            time.sleep(self.lease_poll)
+
+    def release(self, key):
+        # Gives up a lease from get_or_lease without setting a value.
+        self._connection().execute('DELETE FROM leases WHERE key = ?', (key,))
+
+    def _prune(self, conn):
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self.threshold:
+            return
+
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        conn.execute("""
+            DELETE FROM cache WHERE key IN (
+                SELECT key FROM cache ORDER BY accessed ASC LIMIT MAX((SELECT COUNT(*) FROM cache) - ?, 0)
+            )
+        """, (self.threshold,))
+
+    def set(self, key, value, timeout=None):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires_at(timeout), now),
+            )
+            conn.execute('DELETE FROM leases WHERE key = ?', (key,))
+            self._prune(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def has(self, key):
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key):
+        cursor = self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM cache')
+        conn.execute('DELETE FROM leases')
+        return True
+
+    def stats(self):
+        totals = dict(self._connection().execute('SELECT name, value FROM counters').fetchall())
+        with self._counter_lock:
+            for name, value in self._counters.items():
+                totals[name] = totals.get(name, 0) + value
+
+        totals['entries'] = self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        lookups = totals.get('hits', 0) + totals.get('stale_hits', 0) + totals.get('misses', 0)
+        totals['hit_ratio'] = (totals.get('hits', 0) + totals.get('stale_hits', 0)) / lookups if lookups else None
+        return totals
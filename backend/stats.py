@@ -0,0 +1,166 @@
+import re
+
+# Box score labels per category mapped to typed columns. Composite values
+# such as "21/33" or "3-12" are split across two columns.
+STAT_COLUMNS = {
+    'passing': {
+        'C/ATT': ('pass_cmp', 'pass_att'),
+        'YDS': 'pass_yds',
+        'TD': 'pass_td',
+        'INT': 'pass_int',
+        'SACKS': ('sacked', 'sacked_yds'),
+        'QBR': 'qbr',
+        'RTG': 'passer_rating',
+    },
+    'rushing': {
+        'CAR': 'rush_att',
+        'YDS': 'rush_yds',
+        'TD': 'rush_td',
+        'LONG': 'rush_long',
+    },
+    'receiving': {
+        'REC': 'rec',
+        'YDS': 'rec_yds',
+        'TD': 'rec_td',
+        'LONG': 'rec_long',
+        'TGTS': 'targets',
+    },
+    'fumbles': {
+        'FUM': 'fumbles',
+        'LOST': 'fumbles_lost',
+        'REC': 'fumbles_rec',
+    },
+    'defensive': {
+        'TOT': 'tackles',
+        'SOLO': 'solo_tackles',
+        'SACKS': 'def_sacks',
+        'TFL': 'tackles_for_loss',
+        'PD': 'passes_defended',
+        'QB HTS': 'qb_hits',
+        'TD': 'def_td',
+    },
+    'interceptions': {
+        'INT': 'def_int',
+        'YDS': 'int_yds',
+        'TD': 'int_td',
+    },
+    'kickReturns': {
+        'NO': 'kick_returns',
+        'YDS': 'kick_return_yds',
+        'LONG': 'kick_return_long',
+        'TD': 'kick_return_td',
+    },
+    'puntReturns': {
+        'NO': 'punt_returns',
+        'YDS': 'punt_return_yds',
+        'LONG': 'punt_return_long',
+        'TD': 'punt_return_td',
+    },
+    'kicking': {
+        'FG': ('fg_made', 'fg_att'),
+        'LONG': 'fg_long',
+        'XP': ('xp_made', 'xp_att'),
+        'PTS': 'kicking_pts',
+    },
+    'punting': {
+        'NO': 'punts',
+        'YDS': 'punt_yds',
+        'TB': 'touchbacks',
+        'In 20': 'punts_in_20',
+        'LONG': 'punt_long',
+    },
+}
+
+REAL_COLUMNS = ('qbr', 'passer_rating', 'def_sacks')
+
+# Column each box score category is ranked by on the game page.
+SORT_COLUMNS = {
+    'passing': 'pass_yds',
+    'rushing': 'rush_yds',
+    'receiving': 'rec_yds',
+    'fumbles': 'fumbles',
+    'defensive': 'tackles',
+    'interceptions': 'def_int',
+    'kickReturns': 'kick_return_yds',
+    'puntReturns': 'punt_return_yds',
+    'kicking': 'kicking_pts',
+    'punting': 'punt_yds',
+}
+
+COLUMNS = []
+for _labels in STAT_COLUMNS.values():
+    for _target in _labels.values():
+        for _column in (_target if isinstance(_target, tuple) else (_target,)):
+            if _column not in COLUMNS:
+                COLUMNS.append(_column)
+
+COMPOSITE = re.compile(r'^\s*(-?\d+)\s*[/-]\s*(-?\d+)\s*$')
+
+
+def parse_number(value):
+    if value is None:
+        return None
+
+    value = str(value).strip().replace(',', '')
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def typed_stats(category, labels, values):
+    columns = STAT_COLUMNS.get(category, {})
+    typed = {}
+
+    for label, value in zip(labels, values):
+        target = columns.get(label)
+        if target is None:
+            continue
+
+        if isinstance(target, tuple):
+            match = COMPOSITE.match(str(value or ''))
+            if match:
+                typed[target[0]] = int(match.group(1))
+                typed[target[1]] = int(match.group(2))
+        else:
+            typed[target] = parse_number(value)
+    return typed
+
+
+def game_stats_row(player_id, game_id, team_id, typed):
+    return (player_id, game_id, team_id) + tuple(typed.get(column) for column in COLUMNS)
+
+
+def create_table_sql():
+    columns = ',\n'.join(
+        f"        {column} {'REAL' if column in REAL_COLUMNS else 'INTEGER'}" for column in COLUMNS
+    )
+    return f"""
+    CREATE TABLE IF NOT EXISTS player_game_stats (
+        player_id TEXT NOT NULL,
+        game_id TEXT NOT NULL,
+        team_id TEXT,
+{columns},
+        PRIMARY KEY (player_id, game_id)
+    );
+    """
+
+
+UPSERT_GAME_STATS = '''
+    INSERT INTO player_game_stats (player_id, game_id, team_id, {columns})
+    VALUES (?, ?, ?, {placeholders})
+    ON CONFLICT(player_id, game_id) DO UPDATE SET
+        team_id = excluded.team_id,
+        {updates}
+    WHERE team_id IS NOT excluded.team_id
+        OR {changed}
+'''.format(
+    columns=', '.join(COLUMNS),
+    placeholders=', '.join('?' for _ in COLUMNS),
+    updates=',\n        '.join(f'{column} = excluded.{column}' for column in COLUMNS),
+    changed='\n        OR '.join(f'{column} IS NOT excluded.{column}' for column in COLUMNS),
+)
@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+import backend.functions as functions
+import backend.metrics as metrics
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_thread = None
+_listeners = []
+
+_metrics = {
+    'batches': 0,
+    'rows': 0,
+    'failures': 0,
+    'last_flush_ms': None,
+    'max_flush_ms': 0.0,
+    'total_flush_ms': 0.0,
+    'last_lock_wait_ms': None,
+    'max_lock_wait_ms': 0.0,
+}
+
+
+def get_metrics():
+    with _lock:
+        metrics = dict(_metrics)
+
+    metrics['queue_depth'] = _queue.qsize()
+    metrics['avg_flush_ms'] = metrics['total_flush_ms'] / metrics['batches'] if metrics['batches'] else None
+    return metrics
+
+
+BUMP_VERSION = '''
+    INSERT INTO data_versions (tag, version) VALUES (?, 1)
+    ON CONFLICT(tag) DO UPDATE SET version = version + 1
+'''
+
+
+def _flush(conn, statements, tags):
+    started = time.perf_counter()
+    conn.execute('BEGIN IMMEDIATE')
+    locked = time.perf_counter()
+
+    rows = 0
+    try:
+        cursor = conn.cursor()
+        for sql, params in statements:
+            if not params:
+                continue
+            cursor.executemany(sql, params)
+            rows += max(cursor.rowcount, 0)
+        if rows and tags:
+            cursor.executemany(BUMP_VERSION, [(tag,) for tag in tags])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    finished = time.perf_counter()
+    flush_ms = (finished - started) * 1000
+    lock_wait_ms = (locked - started) * 1000
+    metrics.observe('fantasy_db_write_lock_wait_seconds', locked - started)
+
+    with _lock:
+        _metrics['batches'] += 1
+        _metrics['rows'] += rows
+        _metrics['last_flush_ms'] = flush_ms
+        _metrics['max_flush_ms'] = max(_metrics['max_flush_ms'], flush_ms)
+        _metrics['total_flush_ms'] += flush_ms
+        _metrics['last_lock_wait_ms'] = lock_wait_ms
+        _metrics['max_lock_wait_ms'] = max(_metrics['max_lock_wait_ms'], lock_wait_ms)
+    return rows
+
+
+def add_listener(callback):
+    # callback(tags) runs on the writer thread after every commit that changed rows.
+    with _lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+
+def _notify(tags):
+    with _lock:
+        listeners = list(_listeners)
+
+    for callback in listeners:
+        try:
+            callback(tags)
+        except Exception as e:
+            print(f"Write listener failed: {e}")
+
+
+def _loop():
+    conn = functions.get_database()
+
+    while True:
+        statements, tags, done, result = _queue.get()
+        try:
+            result['rows'] = _flush(conn, statements, tags)
+            if result['rows'] and tags:
+                _notify(tags)
+        except Exception as e:
+            print(f"Write batch failed: {e}")
+            with _lock:
+                _metrics['failures'] += 1
+            result['error'] = e
+        finally:
+            if done is not None:
+                done.set()
+            _queue.task_done()
+
+
+def start():
+    global _thread
+
+    with _lock:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_loop, name='db-writer', daemon=True)
+
+    _thread.start()
+
+
+def write(statements, tags=(), wait=True):
+    start()
+
+    statements = [(sql, list(params)) for sql, params in statements]
+    tags = sorted(set(tags))
+    if tags:
+        tags.append('ingest')
+    done = threading.Event() if wait else None
+    result = {}
+    _queue.put((statements, tags, done, result))
+
+    if not wait:
+        return None
+
+    done.wait()
+    if 'error' in result:
+        raise result['error']
+    return result['rows']
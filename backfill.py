@@ -0,0 +1,139 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import backend.config as config
+import backend.client as client
+import backend.fixtures as fixtures
+import backend.functions as functions
+import backend.writer as writer
+import database
+
+CHECKPOINT = '''
+    INSERT OR REPLACE INTO backfill_checkpoints (season, season_type, week, games, completed_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+
+def parse_scoreboard_payload(raw):
+    return functions.parse_scoreboard(json.loads(raw))
+
+
+def parse_boxscore_payload(job):
+    raw, url = job
+    return functions.parse_boxscore(json.loads(raw), url)
+
+
+def fetch(url, args):
+    if args.fixtures:
+        raw = fixtures.load(args.fixtures, url)
+        if raw is None:
+            print(f"No fixture recorded for {url}")
+        return raw
+
+    response = client.get(url, conditional=False)
+    if response.status_code != 200:
+        print(f"Request to {url} failed with status {response.status_code}")
+        return None
+
+    if args.record:
+        fixtures.save(args.record, url, response.content)
+    return response.content
+
+
+def completed_weeks():
+    cursor = functions.get_database(readonly=True).cursor()
+    cursor.execute('SELECT season, season_type, week FROM backfill_checkpoints')
+    return set(cursor.fetchall())
+
+
+def backfill_week(season, season_type, week, args, parsers, fetchers):
+    raw = fetch(functions.scoreboard_url(season, season_type, week), args)
+    if raw is None:
+        return None
+
+    _, game_rows, venue_rows, team_rows = parsers.submit(parse_scoreboard_payload, raw).result()
+    game_ids = [row[0] for row in game_rows]
+
+    urls = [functions.boxscore_url(game_id) for game_id in game_ids]
+    raws = list(fetchers.map(lambda url: fetch(url, args), urls))
+    if any(raw is None for raw in raws):
+        return None
+
+    player_rows = []
+    stat_rows = []
+    game_stats_rows = []
+    for _, _, players, stat, game_stats in parsers.map(parse_boxscore_payload, zip(raws, urls), chunksize=4):
+        player_rows += players
+        stat_rows += stat
+        game_stats_rows += game_stats
+
+    # leagueInfo is left alone so a past season never replaces the current one.
+    statements = functions.scoreboard_statements([], game_rows, venue_rows, team_rows)
+    statements += functions.boxscore_statements(player_rows, stat_rows, game_stats_rows)
+    statements += [
+        functions.clear_fingerprints('game', game_ids),
+        functions.clear_fingerprints('team', [f'{row[1]}:{row[0]}' for row in team_rows]),
+        (CHECKPOINT, [(season, season_type, week, len(game_ids), int(time.time()))]),
+    ]
+    tags = [f'game:{game_id}' for game_id in game_ids] + [f'team:{row[0]}' for row in team_rows]
+    return len(game_ids), writer.write(statements, tags)
+
+
+def week_range(text):
+    first, _, last = text.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load every scoreboard and box score for a range of seasons.')
+    parser.add_argument('first_season', type=int)
+    parser.add_argument('last_season', type=int, nargs='?')
+    parser.add_argument('--season-types', type=int, nargs='+', default=[2], help='2 = regular season, 3 = postseason')
+    parser.add_argument('--weeks', type=week_range, help='e.g. 1-18; defaults to BACKFILL_WEEKS in config.py')
+    parser.add_argument('--workers', type=int, default=config.BACKFILL_WORKERS, help='parser processes')
+    parser.add_argument('--fixtures', help='read recorded responses from this directory instead of the network')
+    parser.add_argument('--record', help='save every response fetched into this directory')
+    parser.add_argument('--restart', action='store_true', help='ignore checkpoints and load every week again')
+    args = parser.parse_args()
+
+    database.init()
+    last_season = args.last_season or args.first_season
+    done = set() if args.restart else completed_weeks()
+
+    started = time.perf_counter()
+    total_games = 0
+    total_rows = 0
+    failed = []
+
+    # Spawned rather than forked: the writer thread may already hold locks when a worker starts.
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn')) as parsers, \
+            ThreadPoolExecutor(max_workers=config.BACKFILL_FETCH_CONCURRENCY) as fetchers:
+        for season in range(args.first_season, last_season + 1):
+            for season_type in args.season_types:
+                for week in args.weeks or range(1, config.BACKFILL_WEEKS.get(season_type, 18) + 1):
+                    if (season, season_type, week) in done:
+                        continue
+
+                    week_started = time.perf_counter()
+                    result = backfill_week(season, season_type, week, args, parsers, fetchers)
+                    if result is None:
+                        print(f"{season} type {season_type} week {week}: incomplete, will retry on the next run")
+                        failed.append((season, season_type, week))
+                        continue
+
+                    games, rows = result
+                    total_games += games
+                    total_rows += rows
+                    print(f"{season} type {season_type} week {week}: {games} games, {rows} rows in {time.perf_counter() - week_started:.2f}s")
+
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {total_games} games, {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.0f} rows/s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import backend.analytics as analytics
+
+POSITIONS = ('QB', 'RB', 'WR', 'TE', 'K', 'LB', 'CB', 'S')
+
+
+def synthetic_season(players, weeks, seed):
+    # One row per player per week played, roughly the shape of a full NFL season.
+    rng = random.Random(seed)
+    positions = {f'p{index}': rng.choice(POSITIONS) for index in range(players)}
+    rows = []
+    for player_id in positions:
+        for week in range(1, weeks + 1):
+            if rng.random() < 0.85:
+                rows.append((player_id, week, rng.randint(-5, 180)))
+    return rows, positions
+
+
+def python_group(rows):
+    by_player = {}
+    for player_id, week, value in rows:
+        by_player.setdefault(player_id, {})[week] = value
+    return by_player
+
+
+def python_compute(by_player, positions, weeks, window):
+    players = sorted(by_player)
+    totals = []
+    averages = []
+    rolling = []
+    for player_id in players:
+        games = by_player[player_id]
+        total = 0
+        for value in games.values():
+            total += value
+        totals.append(total)
+        averages.append(total / len(games))
+
+        windows = []
+        for start in range(1, weeks - window + 2):
+            running = 0
+            for week in range(start, start + window):
+                running += games.get(week, 0)
+            windows.append(running)
+        rolling.append(windows)
+
+    groups = {}
+    for player_id, average in zip(players, averages):
+        groups.setdefault(positions[player_id], []).append(average)
+    for group in groups.values():
+        group.sort()
+
+    percentiles = []
+    for player_id, average in zip(players, averages):
+        group = groups[positions[player_id]]
+        percentiles.append(bisect.bisect_right(group, average) / len(group) * 100)
+
+    return totals, averages, rolling, percentiles
+
+
+def numpy_build(rows):
+    player_ids, weeks, values = zip(*rows)
+    players, _, matrix = analytics.weekly_matrix(player_ids, weeks, values)
+    return players, matrix
+
+
+def numpy_compute(players, matrix, positions, window):
+    average = analytics.averages(matrix)
+    return (
+        analytics.totals(matrix),
+        average,
+        analytics.rolling_totals(matrix, window),
+        analytics.position_percentiles(average, [positions[player] for player in players]),
+    )
+
+
+def best_of(repeat, fn, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare NumPy analytics against a per-row Python loop.')
+    parser.add_argument('--players', type=int, default=1700)
+    parser.add_argument('--weeks', type=int, default=18)
+    parser.add_argument('--window', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    rows, positions = synthetic_season(args.players, args.weeks, args.seed)
+    print(f"{len(rows)} rows, {args.players} players, {args.weeks} weeks, window {args.window}")
+
+    loop_load, by_player = best_of(args.repeat, python_group, rows)
+    loop_time, expected = best_of(args.repeat, python_compute, by_player, positions, args.weeks, args.window)
+    numpy_load, (players, matrix) = best_of(args.repeat, numpy_build, rows)
+    numpy_time, actual = best_of(args.repeat, numpy_compute, players, matrix, positions, args.window)
+
+    for name, left, right in zip(('totals', 'averages', 'rolling', 'percentiles'), expected, actual):
+        if not np.allclose(np.asarray(left, dtype=float), right):
+            print(f"Mismatch in {name}")
+            sys.exit(1)
+
+    print(f"{'':12} {'load':>10} {'compute':>10} {'total':>10}")
+    for name, load, compute in (('python loop', loop_load, loop_time), ('numpy', numpy_load, numpy_time)):
+        print(f"{name:12} {load * 1000:8.2f}ms {compute * 1000:8.2f}ms {(load + compute) * 1000:8.2f}ms")
+    print(f"compute speedup: {loop_time / numpy_time:.1f}x, end to end: {(loop_load + loop_time) / (numpy_load + numpy_time):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
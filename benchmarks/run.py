@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import backend.config as config
+import backend.fixtures as fixtures
+import stub_server
+
+RESULTS = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def commit_id():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{sha}-dirty' if dirty else sha
+
+
+def measure(iterations, fn, rows=None):
+    # The first iteration is cold; later ones show the steady state once fingerprints and upserts skip unchanged rows.
+    timings = []
+    written = 0
+    errors = 0
+    for index in range(iterations):
+        before = rows() if rows else 0
+        started = time.perf_counter()
+        try:
+            fn(index)
+        except Exception as e:
+            errors += 1
+            print(f"  iteration {index} failed: {e}")
+        timings.append(time.perf_counter() - started)
+        written += (rows() - before) if rows else 0
+
+    total = sum(timings)
+    return {
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'first_ms': timings[0] * 1000,
+        'rows': written,
+        'rows_per_sec': written / total if total else 0,
+        'errors': errors,
+    }
+
+
+def pick(items, index):
+    return items[index % len(items)]
+
+
+def ingestors(functions, game_ids, team_ids, athletes, odds_game_ids):
+    season = functions.current_season()
+    return {
+        'fetch_and_store_live_data': lambda i: functions.fetch_and_store_live_data(),
+        'fetch_and_store_boxscore': lambda i: functions.fetch_and_store_boxscore(functions.boxscore_url(pick(game_ids, i))),
+        'fetch_and_store_competition_results': lambda i: functions.fetch_and_store_competition_results(functions.team_schedule_url(pick(team_ids, i))),
+        'fetch_and_store_team_records': lambda i: functions.fetch_and_store_team_records(functions.team_record_url(season, pick(team_ids, i)), pick(team_ids, i)),
+        'fetch_and_store_data_for_depthChart': lambda i: functions.fetch_and_store_data_for_depthChart(functions.team_depth_chart_url(season, pick(team_ids, i)), pick(team_ids, i)),
+        'fetch_and_store_player_data_async': lambda i: asyncio.run(functions.fetch_and_store_player_data_async(functions.team_athlete_urls(pick(team_ids, i)), pick(team_ids, i))),
+        'fetch_and_store_athlete': lambda i: functions.fetch_and_store_athlete(functions.athlete_splits_url(pick(athletes, i)[1]), pick(athletes, i)[1], season),
+        'fetch_and_store_athlete_projections': lambda i: functions.fetch_and_store_athlete_projections(functions.athlete_projections_url(season, pick(athletes, i)[1]), pick(athletes, i)[1], season),
+        'fetch_and_store_odds': lambda i: functions.fetch_and_store_odds(functions.odds_url(pick(odds_game_ids, i))),
+    }
+
+
+def routes(game_ids, team_ids, athletes):
+    return {
+        'home': lambda i: '/',
+        'game': lambda i: f'/game/{pick(game_ids, i)}',
+        'team': lambda i: f'/game/teams/{pick(team_ids, i)}',
+        'player': lambda i: '/game/teams/{2}/player/{0}/{1}'.format(*pick(athletes, i)),
+    }
+
+
+def compare(current, previous):
+    print(f"\nCompared with {previous['commit']}:")
+    for section in ('ingestors', 'routes'):
+        for name, result in current[section].items():
+            before = previous.get(section, {}).get(name)
+            if not before or not before['p50_ms']:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            print(f"  {name:40} p50 {before['p50_ms']:8.2f} -> {result['p50_ms']:8.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every ingestor and route against replayed upstream responses.')
+    parser.add_argument('--fixtures', default=stub_server.DEFAULT_FIXTURES)
+    parser.add_argument('--latency', type=float, default=20, help='simulated upstream latency in ms')
+    parser.add_argument('--jitter', type=float, default=5)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--compare', help='commit id of an earlier run in benchmarks/results')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.fixtures):
+        print(f"No fixtures in {args.fixtures}. Record some first, e.g. run the app with FANTASY_RECORD={args.fixtures} "
+              f"and open a few pages, or run backfill.py with --record {args.fixtures}")
+        sys.exit(1)
+
+    # Fresh database and page cache so runs are comparable; must be set before the app modules are imported.
+    workdir = tempfile.mkdtemp(prefix='fantasy-bench-')
+    config.DATABASE = os.path.join(workdir, 'db_fantasy.db')
+    config.CACHE_DATABASE = os.path.join(workdir, 'cache.db')
+
+    server = stub_server.serve(args.fixtures, latency_ms=args.latency, jitter_ms=args.jitter)
+    host, port = server.server_address[:2]
+    config.UPSTREAM_OVERRIDE = f'http://{host}:{port}'
+    # Routes are timed without the background poller competing for the stub server.
+    config.INGEST_ENABLED = False
+
+    import app
+    import backend.functions as functions
+    import backend.writer as writer
+
+    written = lambda: writer.get_metrics()['rows']
+
+    game_ids, _ = functions.fetch_and_store_live_data() or ([], 0)
+    cursor = functions.get_database(readonly=True).cursor()
+    team_ids = [row[0] for row in cursor.execute('SELECT DISTINCT team_id FROM teams ORDER BY team_id')]
+    if not game_ids or not team_ids:
+        print("The recorded scoreboard has no games; nothing to benchmark")
+        sys.exit(1)
+
+    season = functions.current_season()
+    for team_id in team_ids:
+        asyncio.run(functions.refresh_team_async(
+            team_id,
+            functions.team_schedule_url(team_id),
+            functions.team_record_url(season, team_id),
+            functions.team_depth_chart_url(season, team_id),
+        ))
+    athletes = cursor.execute('SELECT slug, athlete_id, team_id FROM athletes WHERE slug IS NOT NULL ORDER BY athlete_id').fetchall()
+    # No page fetches odds, so their fixtures are only there if recorded on purpose.
+    odds_game_ids = [game_id for game_id in game_ids if fixtures.load(args.fixtures, functions.odds_url(game_id)) is not None]
+
+    results = {
+        'commit': commit_id(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'latency_ms': args.latency,
+        'iterations': args.iterations,
+        'ingestors': {},
+        'routes': {},
+    }
+
+    print(f"{len(game_ids)} games, {len(team_ids)} teams, {len(athletes)} athletes, {args.latency:.0f}ms upstream latency")
+    print(f"{'':40} {'first':>9} {'p50':>9} {'p95':>9} {'rows':>7} {'rows/s':>9}")
+
+    for name, fn in ingestors(functions, game_ids, team_ids, athletes, odds_game_ids).items():
+        if not athletes and 'athlete' in name:
+            continue
+        if not odds_game_ids and name == 'fetch_and_store_odds':
+            print(f"{name:40} skipped, no odds fixtures recorded")
+            continue
+        result = measure(args.iterations, fn, written)
+        results['ingestors'][name] = result
+        print(f"{name:40} {result['first_ms']:7.2f}ms {result['p50_ms']:7.2f}ms {result['p95_ms']:7.2f}ms {result['rows']:7} {result['rows_per_sec']:9.0f}")
+
+    client = app.app.test_client()
+    for name, path in routes(game_ids, team_ids, athletes).items():
+        if not athletes and name == 'player':
+            continue
+
+        def request(index):
+            response = client.get(path(index))
+            if response.status_code != 200:
+                raise RuntimeError(f'{path(index)} returned {response.status_code}')
+
+        result = measure(args.iterations, request)
+        results['routes'][name] = result
+        print(f"{'route ' + name:40} {result['first_ms']:7.2f}ms {result['p50_ms']:7.2f}ms {result['p95_ms']:7.2f}ms")
+
+    previous = None
+    if args.compare:
+        with open(os.path.join(RESULTS, f'{args.compare}.json')) as f:
+            previous = json.load(f)
+
+    os.makedirs(RESULTS, exist_ok=True)
+    path = os.path.join(RESULTS, f"{results['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {path}")
+
+    if previous:
+        compare(results, previous)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
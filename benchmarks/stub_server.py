@@ -0,0 +1,87 @@
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backend.fixtures as fixtures
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def make_handler(directory, latency_ms, jitter_ms, etags):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        # Requests arrive as /<host>/<path>?<query>, see client.upstream_url.
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            body = fixtures.load(directory, 'https:/' + self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if etags and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if etags:
+                self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def serve(directory=DEFAULT_FIXTURES, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, etags=False):
+    server = ThreadingHTTPServer((host, port), make_handler(directory, latency_ms, jitter_ms, etags))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded ESPN and Sleeper responses over HTTP.')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='added delay per response in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='random +/- variation on the delay in ms')
+    parser.add_argument('--etags', action='store_true', help='send ETags and answer matching requests with 304')
+    args = parser.parse_args()
+
+    server = serve(args.fixtures, args.host, args.port, args.latency, args.jitter, args.etags)
+    host, port = server.server_address[:2]
+    print(f"Replaying {args.fixtures} at http://{host}:{port}")
+    print(f"Start the app with FANTASY_UPSTREAM=http://{host}:{port} to use it")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
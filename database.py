@@ -1,11 +1,20 @@
+import os
+import re
 import sqlite3
+import sys
+import backend.config as config
+import backend.queries as queries
+import backend.stats as stats
+import backend.scoring as scoring
+import backend.cadence as cadence
 
-DATABASE = 'database/db_fantasy.db'
+DATABASE = config.DATABASE
 
-conn = sqlite3.connect(DATABASE)
-cursor = conn.cursor()
+# Single-row lookup tables that are fine to scan.
+SMALL_TABLES = ('leagueInfo', 'current_week')
 
-cursor.execute("""
+BASE_SCHEMA = [
+    """
     CREATE TABLE IF NOT EXISTS leagueInfo (
         id TEXT PRIMARY KEY,
         year TEXT,
@@ -14,9 +23,8 @@ cursor.execute("""
         type TEXT,
         name TEXT
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS nflWeek (
         week INTEGER PRIMARY KEY,
         season_type TEXT,
@@ -24,9 +32,8 @@ cursor.execute("""
         season INTEGER,
         display_week TEXT
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS games (
         game_id TEXT PRIMARY KEY,
         name TEXT,
@@ -41,9 +48,8 @@ cursor.execute("""
         down TEXT,
         detailed_text TEXT
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS teams (
         team_id TEXT,
         game_id TEXT,
@@ -56,9 +62,8 @@ cursor.execute("""
         PRIMARY KEY (team_id, game_id),
         FOREIGN KEY (game_id) REFERENCES games (game_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS records (
         team_id INTEGER PRIMARY KEY,
         record TEXT,
@@ -74,11 +79,8 @@ cursor.execute("""
         playoff_seed INTEGER,
         streak TEXT
     );
-
-""")
-
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS venues (
         venue_id TEXT PRIMARY KEY,
         full_name TEXT,
@@ -86,18 +88,16 @@ cursor.execute("""
         state TEXT,
         indoor BOOLEAN
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS broadcasts (
         game_id TEXT,
         market TEXT,
         channel TEXT,
         FOREIGN KEY (game_id) REFERENCES games (game_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS competition_results (
         result_id INTEGER PRIMARY KEY AUTOINCREMENT,
         game_id TEXT,
@@ -117,10 +117,8 @@ cursor.execute("""
         FOREIGN KEY (team_id) REFERENCES teams (team_id),
         FOREIGN KEY (opponent_id) REFERENCES teams (team_id)
     );
-
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS players (
         player_id TEXT PRIMARY KEY,
         full_name TEXT,
@@ -130,9 +128,8 @@ cursor.execute("""
         team_id TEXT,
         FOREIGN KEY (team_id) REFERENCES teams (team_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS depthChart (
             team_id TEXT,
             position_category TEXT,
@@ -141,10 +138,8 @@ cursor.execute("""
             rank TEXT,
             athlete_url TEXT
     )
-               
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS athletes (
                team_id TEXT,
                player_name TEXT,
@@ -164,9 +159,8 @@ cursor.execute("""
                athlete_url TEXT,
                athlete_id TEXT
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS player_stats (
         stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
         player_id TEXT,
@@ -180,10 +174,8 @@ cursor.execute("""
         FOREIGN KEY (game_id) REFERENCES games (game_id),
         FOREIGN KEY (team_id) REFERENCES teams (team_id)
     );
-""")
-
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS odds (
         odds_id INTEGER PRIMARY KEY AUTOINCREMENT,
         game_id TEXT,
@@ -197,9 +189,8 @@ cursor.execute("""
         spread_winner BOOLEAN,
         FOREIGN KEY (game_id) REFERENCES games (game_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
         CREATE TABLE IF NOT EXISTS boxscore_data (
             team_id TEXT,
             team_name TEXT,
@@ -212,17 +203,15 @@ cursor.execute("""
             stat_value TEXT,
             PRIMARY KEY (team_id, player_id, stat_category)
             );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS odds_provider (
         provider_id TEXT PRIMARY KEY,
         name TEXT,
         priority INTEGER
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS team_odds (
         team_odds_id INTEGER PRIMARY KEY AUTOINCREMENT,
         odds_id INTEGER,
@@ -237,9 +226,8 @@ cursor.execute("""
         FOREIGN KEY (game_id) REFERENCES games (game_id),
         FOREIGN KEY (odds_id) REFERENCES odds (odds_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS odds_details (
         odds_detail_id INTEGER PRIMARY KEY AUTOINCREMENT,
         odds_id INTEGER,
@@ -253,9 +241,8 @@ cursor.execute("""
         outcome_type TEXT,
         FOREIGN KEY (odds_id) REFERENCES odds (odds_id)
     );
-""")
-
-cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS odds_links (
         link_id INTEGER PRIMARY KEY AUTOINCREMENT,
         odds_id INTEGER,
@@ -267,7 +254,476 @@ cursor.execute("""
         is_premium BOOLEAN,
         FOREIGN KEY (odds_id) REFERENCES odds (odds_id)
     );
-""")
+    """,
+]
+
+PLAYER_STATS_NATURAL_KEY = [
+    """
+    DELETE FROM player_stats
+    WHERE stat_id NOT IN (
+        SELECT MAX(stat_id)
+        FROM player_stats
+        GROUP BY player_id, game_id, category, stat_key
+    );
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_player_stats_natural_key
+    ON player_stats (player_id, game_id, category, stat_key);
+    """,
+]
+
+FINGERPRINTS = [
+    """
+    CREATE TABLE IF NOT EXISTS fingerprints (
+        entity TEXT,
+        entity_id TEXT,
+        digest TEXT,
+        PRIMARY KEY (entity, entity_id)
+    );
+    """,
+]
+
+ROUTE_INDEXES = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_teams_game_id ON teams (game_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_player_stats_game_team ON player_stats (game_id, team_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_depthChart_team_id ON depthChart (team_id, athlete_url);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_athletes_slug ON athletes (slug);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_athletes_url_team ON athletes (athlete_url, team_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_competition_results_team_game ON competition_results (team_id, game_id);
+    """,
+]
+
+ATHLETE_FRESHNESS = [
+    """
+    ALTER TABLE athletes ADD COLUMN fetched_at INTEGER;
+    """,
+    """
+    DELETE FROM athletes
+    WHERE rowid NOT IN (
+        SELECT MAX(rowid)
+        FROM athletes
+        GROUP BY athlete_url, team_id
+    );
+    """,
+    """
+    DROP INDEX IF EXISTS idx_athletes_url_team;
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_athletes_url_team ON athletes (athlete_url, team_id);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_athletes_team_fetched ON athletes (team_id, fetched_at);
+    """,
+]
+
+DATA_VERSIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        tag TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+]
+
+ATHLETE_SPLITS = [
+    """
+    CREATE TABLE IF NOT EXISTS athlete_splits (
+        athlete_id TEXT NOT NULL,
+        season INTEGER NOT NULL,
+        splits TEXT NOT NULL,
+        fetched_at INTEGER NOT NULL,
+        PRIMARY KEY (athlete_id, season)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS athlete_projections (
+        athlete_id TEXT NOT NULL,
+        season INTEGER NOT NULL,
+        projections TEXT NOT NULL,
+        fetched_at INTEGER NOT NULL,
+        PRIMARY KEY (athlete_id, season)
+    );
+    """,
+]
+
+def backfill_player_game_stats(conn):
+    typed_by_player = {}
+    team_ids = {}
+    cursor = conn.execute('SELECT player_id, game_id, team_id, category, stat_key, stat_value FROM player_stats ORDER BY stat_id')
+    for player_id, game_id, team_id, category, stat_key, stat_value in cursor:
+        typed = typed_by_player.setdefault((player_id, game_id), {})
+        typed.update(stats.typed_stats(category, [stat_key], [stat_value]))
+        team_ids[(player_id, game_id)] = team_id
+
+    conn.executemany(stats.UPSERT_GAME_STATS, [
+        stats.game_stats_row(player_id, game_id, team_ids[(player_id, game_id)], typed)
+        for (player_id, game_id), typed in typed_by_player.items()
+    ])
+
+
+PLAYER_GAME_STATS = [
+    stats.create_table_sql(),
+    """
+    CREATE INDEX IF NOT EXISTS idx_player_game_stats_game_team ON player_game_stats (game_id, team_id);
+    """,
+    backfill_player_game_stats,
+]
+
+FANTASY_POINTS = [
+    """
+    CREATE TABLE IF NOT EXISTS fantasy_points (
+        player_id TEXT NOT NULL,
+        game_id TEXT NOT NULL,
+        rule_set TEXT NOT NULL,
+        team_id TEXT,
+        points REAL NOT NULL,
+        PRIMARY KEY (player_id, game_id, rule_set)
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fantasy_points_game ON fantasy_points (game_id, rule_set, points);
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_fantasy_points_rule_set ON fantasy_points (rule_set, game_id);
+    """,
+    scoring.rescore,
+]
+
+BACKFILL_CHECKPOINTS = [
+    """
+    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+        season INTEGER NOT NULL,
+        season_type INTEGER NOT NULL,
+        week INTEGER NOT NULL,
+        games INTEGER NOT NULL,
+        completed_at INTEGER NOT NULL,
+        PRIMARY KEY (season, season_type, week)
+    );
+    """,
+]
+
+SCOREBOARD = [
+    """
+    CREATE TABLE IF NOT EXISTS scoreboard (
+        game_id TEXT PRIMARY KEY,
+        season INTEGER,
+        season_type INTEGER,
+        week INTEGER,
+        name TEXT,
+        date TEXT,
+        status TEXT,
+        clock TEXT,
+        period TEXT,
+        down TEXT,
+        detailed_text TEXT,
+        home_team_id TEXT,
+        home_name TEXT,
+        home_score INTEGER,
+        home_abbreviation TEXT,
+        home_logo TEXT,
+        away_team_id TEXT,
+        away_name TEXT,
+        away_score INTEGER,
+        away_abbreviation TEXT,
+        away_logo TEXT
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_scoreboard_week ON scoreboard (season, season_type, week);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS current_week (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        season INTEGER NOT NULL,
+        season_type INTEGER NOT NULL,
+        week INTEGER NOT NULL
+    );
+    """,
+    # Filled by migration 12, once games have the kickoff column the refresh copies.
+]
+
+def backfill_kickoffs(conn):
+    rows = conn.execute('SELECT game_id, date FROM games WHERE kickoff IS NULL').fetchall()
+    updates = []
+    for game_id, date in rows:
+        kickoff = cadence.parse_kickoff(date)
+        if kickoff is not None:
+            updates.append((kickoff, cadence.iso_kickoff(kickoff), game_id))
+    conn.executemany('UPDATE games SET kickoff = ?, date = ? WHERE game_id = ?', updates)
+
+
+KICKOFFS = [
+    """
+    ALTER TABLE games ADD COLUMN kickoff INTEGER;
+    """,
+    """
+    ALTER TABLE scoreboard ADD COLUMN kickoff INTEGER;
+    """,
+    backfill_kickoffs,
+    """
+    CREATE INDEX IF NOT EXISTS idx_games_kickoff ON games (kickoff);
+    """,
+    """
+    DROP INDEX IF EXISTS idx_scoreboard_week;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_scoreboard_week ON scoreboard (season, season_type, week, kickoff);
+    """,
+    # Games written only by a team schedule have no status or season and are left out, as home() did.
+    queries.REFRESH_SCOREBOARD.format(where='WHERE g.year IS NOT NULL AND g.status IS NOT NULL'),
+    """
+    INSERT OR IGNORE INTO current_week (id, season, season_type, week)
+    SELECT 1, season, season_type, week FROM scoreboard
+    ORDER BY season DESC, season_type DESC, week DESC
+    LIMIT 1;
+    """,
+]
+
+SLEEPER_PLAYERS = [
+    """
+    CREATE TABLE IF NOT EXISTS sleeper_players (
+        player_id TEXT PRIMARY KEY,
+        full_name TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        search_full_name TEXT,
+        position TEXT,
+        fantasy_positions TEXT,
+        team TEXT,
+        number INTEGER,
+        status TEXT,
+        active INTEGER,
+        injury_status TEXT,
+        age INTEGER,
+        birth_date TEXT,
+        years_exp INTEGER,
+        height TEXT,
+        weight TEXT,
+        college TEXT,
+        depth_chart_order INTEGER,
+        espn_id TEXT,
+        yahoo_id TEXT
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_sleeper_players_espn_id ON sleeper_players (espn_id);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sleeper_dumps (
+        loaded_at INTEGER NOT NULL,
+        digest TEXT NOT NULL,
+        players INTEGER NOT NULL,
+        rows INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        peak_rss_kb INTEGER
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_sleeper_dumps_loaded_at ON sleeper_dumps (loaded_at);
+    """,
+]
+
+PLAYER_CROSSWALK = [
+    """
+    CREATE TABLE IF NOT EXISTS player_crosswalk (
+        sleeper_id TEXT PRIMARY KEY,
+        espn_id TEXT NOT NULL,
+        method TEXT NOT NULL,
+        score REAL NOT NULL,
+        matched_at INTEGER NOT NULL
+    );
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_player_crosswalk_espn_id ON player_crosswalk (espn_id);
+    """,
+]
+
+# Name matches made while "John" was read as a nickname for "Jonathan"; the next crosswalk run redoes them.
+REMATCH_CROSSWALK_NAMES = [
+    """
+    DELETE FROM player_crosswalk WHERE method != 'espn_id';
+    """,
+]
+
+# Odds were appended on every fetch. Keep the newest line per game and provider,
+# and the newest team line per odds row, so both can be upserted.
+ODDS_NATURAL_KEYS = [
+    """
+    DELETE FROM odds WHERE odds_id NOT IN (SELECT MAX(odds_id) FROM odds GROUP BY game_id, provider_id);
+    """,
+    """
+    DELETE FROM team_odds
+    WHERE odds_id NOT IN (SELECT odds_id FROM odds)
+    OR team_odds_id NOT IN (SELECT MAX(team_odds_id) FROM team_odds GROUP BY odds_id, team_id);
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_odds_game_provider ON odds (game_id, provider_id);
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_team_odds_odds_team ON team_odds (odds_id, team_id);
+    """,
+]
+
+# Every worker runs a scheduler; the one holding this row polls, and its status is
+# published here for the pages the others render.
+INGEST_LEASE = [
+    """
+    CREATE TABLE IF NOT EXISTS ingest_lease (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        status TEXT
+    );
+    """,
+]
+
+# The API pages through a season's games by game_id.
+SEASON_GAME_INDEX = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_games_year_game ON games (year, game_id);
+    """,
+]
+
+MIGRATIONS = [
+    (1, 'base schema', BASE_SCHEMA),
+    (2, 'player_stats natural key', PLAYER_STATS_NATURAL_KEY),
+    (3, 'ingestion fingerprints', FINGERPRINTS),
+    (4, 'route query indexes', ROUTE_INDEXES),
+    (5, 'athlete freshness and natural key', ATHLETE_FRESHNESS),
+    (6, 'data versions for cache invalidation', DATA_VERSIONS),
+    (7, 'persisted athlete splits and projections', ATHLETE_SPLITS),
+    (8, 'typed per-game player stats', PLAYER_GAME_STATS),
+    (9, 'precomputed fantasy points', FANTASY_POINTS),
+    (10, 'backfill checkpoints', BACKFILL_CHECKPOINTS),
+    (11, 'materialized scoreboard', SCOREBOARD),
+    (12, 'kickoff timestamps', KICKOFFS),
+    (13, 'sleeper player dump', SLEEPER_PLAYERS),
+    (14, 'sleeper to espn player crosswalk', PLAYER_CROSSWALK),
+    (15, 'redo crosswalk name matches', REMATCH_CROSSWALK_NAMES),
+    (16, 'odds natural keys', ODDS_NATURAL_KEYS),
+    (17, 'ingestion lease', INGEST_LEASE),
+    (18, 'season game index', SEASON_GAME_INDEX),
+]
+
+
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn):
+    version = current_version(conn)
+    conn.commit()
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+
+        # Every worker migrates at startup. BEGIN IMMEDIATE takes the write lock before
+        # the version is read again, so a second process waits here and then skips the
+        # steps the first one applied.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+            if number <= version:
+                conn.rollback()
+                continue
+
+            print(f"Applying migration {number}: {description}")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)', (number, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return current_version(conn)
+
+
+def init():
+    directory = os.path.dirname(DATABASE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Long enough to wait out another process's migrations, including the backfills.
+    conn = sqlite3.connect(DATABASE, timeout=config.MIGRATION_LOCK_TIMEOUT)
+    conn.execute('PRAGMA journal_mode = WAL')
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
+
+
+TABLE_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN)\s+(\w+)'
+    r'(?:\s+(?:AS\s+)?(?!(?:WHERE|ON|JOIN|LEFT|INNER|CROSS|GROUP|ORDER|LIMIT|USING|UNION|NATURAL)\b)(\w+))?',
+    re.IGNORECASE,
+)
+
+
+def table_aliases(sql):
+    # Query plans name a table by its alias, e.g. "SCAN s" for "FROM scoreboard s".
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def explain(conn):
+    full_scans = []
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    for name, (sql, params) in queries.ROUTE_QUERIES.items():
+        print(f"-- {name}")
+        aliases = table_aliases(sql)
+        for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params):
+            detail = row[-1]
+            print(f"   {detail}")
+            if not detail.startswith('SCAN '):
+                continue
+            # Constant rows and subquery results are not tables, so only real tables count.
+            table = aliases.get(detail.split()[1], detail.split()[1])
+            if table in tables and table not in SMALL_TABLES:
+                full_scans.append((name, detail))
+
+    if full_scans:
+        print("\nFull table scans:")
+        for name, detail in full_scans:
+            print(f"   {name}: {detail}")
+    else:
+        print("\nNo full table scans in route queries.")
+    return full_scans
+
+
+if __name__ == '__main__':
+    print(f"Database at schema version {init()}")
 
-conn.commit()
-conn.close()
+    if '--explain' in sys.argv:
+        conn = sqlite3.connect(DATABASE)
+        scans = explain(conn)
+        conn.close()
+        sys.exit(1 if scans else 0)
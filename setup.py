@@ -12,6 +12,7 @@ try:
     import requests
     import asyncio
     import aiohttp
+    import numpy
 except ImportError as e:
     package_name = str(e).split("'")[1]
     print(f'Package {package_name} is not installed.')
@@ -19,7 +20,7 @@ except ImportError as e:
 install = input("Would you like to install all required packages? (y/n): ").strip().lower()
 if install == 'y':
     subprocess.run(['pip', 'install', '--upgrade', 'pip'])
-    subprocess.run(['pip', 'install', 'flask', 'flask-caching', 'requests', 'asyncio', 'aiohttp'])
+    subprocess.run(['pip', 'install', 'flask', 'flask-caching', 'requests', 'asyncio', 'aiohttp', 'numpy'])
 else:
     print("Please install the required packages manually and run program again! GoodBye!")
     sys.exit(1)
@@ -0,0 +1,40 @@
+import sqlite3
+import numpy as np
+import backend.analytics as analytics
+
+
+def _database(lines):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE games (game_id TEXT PRIMARY KEY, year TEXT, season_id TEXT, week INTEGER)')
+    conn.execute('CREATE TABLE player_game_stats (player_id TEXT, game_id TEXT, pass_yds REAL)')
+    for game_id, year, season_type, week, player_id, yards in lines:
+        conn.execute('INSERT OR IGNORE INTO games VALUES (?, ?, ?, ?)', (game_id, year, season_type, week))
+        conn.execute('INSERT INTO player_game_stats VALUES (?, ?, ?)', (player_id, game_id, yards))
+    return conn
+
+
+def test_weeks_with_the_same_number_stay_apart():
+    conn = _database([
+        ('g1', '2025', '2', 1, 'p1', 100),
+        ('g2', '2025', '3', 1, 'p1', 50),
+        ('g3', '2025', '2', 2, 'p1', 80),
+        ('g4', '2024', '2', 1, 'p1', 30),
+    ])
+
+    players, weeks, matrix = analytics.load_weekly(conn, 'pass_yds')
+    assert list(players) == ['p1']
+    assert [tuple(week) for week in weeks] == [(2024, 2, 1), (2025, 2, 1), (2025, 2, 2), (2025, 3, 1)]
+    assert analytics.totals(matrix).tolist() == [260]
+
+    _, weeks, matrix = analytics.load_weekly(conn, 'pass_yds', season=2025)
+    assert len(weeks) == 3
+    assert analytics.totals(matrix).tolist() == [230]
+    assert analytics.games_played(matrix).tolist() == [3]
+
+
+def test_lines_in_the_same_cell_are_added():
+    players, _, matrix = analytics.weekly_matrix(['p1', 'p1', 'p2'], [1, 1, 2], [10, 5, 7])
+    assert list(players) == ['p1', 'p2']
+    assert matrix[0].tolist()[0] == 15
+    assert np.isnan(matrix[0, 1])
+    assert analytics.totals(matrix).tolist() == [15, 7]
@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import pytest
+import backend.config as config
+import backend.functions as functions
+import backend.stats as stats
+import backend.writer as writer
+import database
+
+URL = functions.boxscore_url('401')
+
+
+def _athlete(player_id, name, values):
+    first, last = name.split(' ', 1)
+    return {'athlete': {'id': player_id, 'displayName': name, 'firstName': first, 'lastName': last, 'jersey': '9'},
+            'stats': values}
+
+
+def _boxscore(pass_yds='280', rush_yds='41'):
+    passing = {'name': 'passing', 'labels': ['C/ATT', 'YDS', 'TD', 'INT', 'SACKS', 'QBR', 'RTG'],
+               'athletes': [_athlete('p1', 'Joe Burrow', ['24/33', pass_yds, '2', '0', '2-14', '71.3', '112.4'])]}
+    rushing = {'name': 'rushing', 'labels': ['CAR', 'YDS', 'TD', 'LONG'],
+               'athletes': [_athlete('p1', 'Joe Burrow', ['3', '9', '0', '6']),
+                            _athlete('p2', 'Chase Brown', ['15', rush_yds, '1', '12'])]}
+    defensive = {'name': 'defensive', 'labels': ['TOT', 'SOLO', 'SACKS', 'TFL', 'PD', 'QB HTS', 'TD'],
+                 'athletes': [_athlete('p3', 'Myles Garrett', ['5', '4', '1.5', '2', '0', '3', '0'])]}
+    return {'gamepackageJSON': {
+        'game': {'id': '401'},
+        'boxscore': {
+            'teams': [{'team': {'id': '4'}}, {'team': {'id': '5'}}],
+            'players': [
+                {'team': {'id': '4'}, 'statistics': [passing, rushing]},
+                {'team': {'id': '5'}, 'statistics': [defensive]},
+            ],
+        },
+    }}
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    path = str(tmp_path / 'fantasy.db')
+    monkeypatch.setattr(config, 'DATABASE', path)
+    monkeypatch.setattr(functions, '_connections', threading.local())
+
+    conn = sqlite3.connect(path)
+    database.migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _store(conn, espn_data):
+    # fetch_and_store_boxscore without the request and with the write run inline.
+    game_id, team_ids, player_rows, stat_rows, game_stats_rows = functions.parse_boxscore(espn_data, URL)
+    game_stats_rows = functions.changed_game_stats(game_id, game_stats_rows)
+    statements = functions.boxscore_statements(player_rows, stat_rows, game_stats_rows)
+    return writer._flush(conn, statements, [f'game:{game_id}']), game_stats_rows
+
+
+def _game_stats(conn, player_id, *columns):
+    return conn.execute(f'SELECT {", ".join(columns)} FROM player_game_stats WHERE player_id = ?', (player_id,)).fetchone()
+
+
+def test_parse_boxscore():
+    game_id, team_ids, player_rows, stat_rows, game_stats_rows = functions.parse_boxscore(_boxscore(), URL)
+    assert game_id == '401'
+    assert team_ids == ['4', '5']
+    assert ('p2', 'Chase Brown', 'Chase', 'Brown', '9', '4') in player_rows
+    assert ('p1', '401', '4', 'passing', 'C/ATT', '24/33', '9') in stat_rows
+
+    # One typed row per player, merging every category they appear in.
+    typed = {row[0]: dict(zip(('player_id', 'game_id', 'team_id') + tuple(stats.COLUMNS), row)) for row in game_stats_rows}
+    assert sorted(typed) == ['p1', 'p2', 'p3']
+    assert (typed['p1']['pass_cmp'], typed['p1']['pass_att'], typed['p1']['pass_yds']) == (24, 33, 280)
+    assert (typed['p1']['sacked'], typed['p1']['sacked_yds'], typed['p1']['passer_rating']) == (2, 14, 112.4)
+    assert typed['p1']['rush_yds'] == 9
+    assert (typed['p3']['team_id'], typed['p3']['def_sacks']) == ('5', 1.5)
+    assert typed['p2']['pass_yds'] is None
+
+
+def test_game_id_falls_back_to_the_url():
+    espn_data = _boxscore()
+    del espn_data['gamepackageJSON']['game']
+    assert functions.parse_boxscore(espn_data, functions.boxscore_url('402'))[0] == '402'
+
+
+def test_an_unchanged_box_score_writes_nothing(conn):
+    rows, game_stats_rows = _store(conn, _boxscore())
+    assert rows > 0
+    assert len(game_stats_rows) == 3
+    assert _game_stats(conn, 'p1', 'pass_yds', 'passer_rating') == (280, 112.4)
+    version = conn.execute("SELECT version FROM data_versions WHERE tag = 'game:401'").fetchone()
+
+    rows, game_stats_rows = _store(conn, _boxscore())
+    assert (rows, game_stats_rows) == (0, [])
+    assert conn.execute("SELECT version FROM data_versions WHERE tag = 'game:401'").fetchone() == version
+
+
+def test_only_changed_players_are_rewritten(conn):
+    _store(conn, _boxscore())
+
+    rows, game_stats_rows = _store(conn, _boxscore(rush_yds='58'))
+    assert [row[0] for row in game_stats_rows] == ['p2']
+    assert rows > 0
+    assert _game_stats(conn, 'p2', 'rush_yds') == (58,)
+    assert conn.execute("SELECT stat_value FROM player_stats WHERE player_id = 'p2' AND stat_key = 'YDS'").fetchone() == ('58',)
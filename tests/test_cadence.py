@@ -0,0 +1,57 @@
+import backend.cadence as cadence
+import backend.config as config
+
+NOW = 1_700_000_000
+
+
+def test_game_state():
+    assert cadence.game_state(None, None) == 'scheduled'
+    assert cadence.game_state('Scheduled', '0:00') == 'scheduled'
+    assert cadence.game_state('Final', '0:00') == 'final'
+    assert cadence.game_state('Final/OT', '0:00') == 'final'
+    assert cadence.game_state('Postponed', None) == 'final'
+    assert cadence.game_state('Halftime', '0:00') == 'break'
+    assert cadence.game_state('In Progress', '0:00') == 'break'
+    assert cadence.game_state('In Progress', '7:42') == 'live'
+
+
+def test_an_empty_slate_polls_at_the_idle_interval():
+    assert cadence.plan_scoreboard([], NOW) == config.POLL_IDLE
+
+
+def test_live_and_break_games_set_the_pace():
+    scheduled = ('3', 'scheduled', NOW + 3600)
+    assert cadence.plan_scoreboard([('1', 'live', NOW), ('2', 'break', NOW), scheduled], NOW) == config.POLL_LIVE
+    assert cadence.plan_scoreboard([('2', 'break', NOW), scheduled], NOW) == config.POLL_BREAK
+
+
+def test_a_finished_slate_stops_polling():
+    assert cadence.plan_scoreboard([('1', 'final', NOW), ('2', 'final', NOW)], NOW) is None
+
+
+def test_waits_for_the_pregame_window_of_the_next_kickoff():
+    def plan(kickoff):
+        return cadence.plan_scoreboard([('1', 'final', NOW - 9000), ('2', 'scheduled', kickoff)], NOW)
+
+    assert plan(NOW + config.PREGAME_WINDOW + 1800) == 1800
+    assert plan(NOW + config.PREGAME_WINDOW + 60) == config.POLL_PREGAME
+    assert plan(NOW + config.PREGAME_WINDOW + 10 * config.POLL_IDLE) == config.POLL_IDLE
+    assert plan(NOW + 600) == config.POLL_PREGAME
+    # ESPN has not flipped the status yet.
+    assert plan(NOW - 60) == config.POLL_LIVE
+
+
+def test_scheduled_games_without_a_kickoff_poll_at_the_pregame_interval():
+    assert cadence.plan_scoreboard([('1', 'scheduled', None)], NOW) == config.POLL_PREGAME
+
+
+def test_box_scores_follow_live_games_and_each_final_once():
+    games = [('1', 'live', NOW), ('2', 'break', NOW), ('3', 'final', NOW), ('4', 'final', NOW), ('5', 'scheduled', NOW)]
+    assert cadence.plan_boxscores(games, finished={'4'}) == ['1', '2', '3']
+
+
+def test_kickoff_formats_round_trip():
+    kickoff = cadence.parse_kickoff('2025-09-07T17:00Z')
+    assert cadence.iso_kickoff(kickoff) == '2025-09-07T17:00Z'
+    assert cadence.parse_kickoff(cadence.format_kickoff(kickoff)) == kickoff
+    assert cadence.parse_kickoff('not a date') is None
@@ -0,0 +1,73 @@
+import backend.crosswalk as crosswalk
+
+
+def test_normalize_name():
+    assert crosswalk.normalize_name('Patrick Mahomes II') == 'patrick mahomes'
+    assert crosswalk.normalize_name("Ja'Marr Chase") == 'jamarr chase'
+    assert crosswalk.normalize_name('Mike Evans') == 'michael evans'
+    assert crosswalk.normalize_name('A.J. Brown') == 'aj brown'
+    assert crosswalk.normalize_name('Kenneth Walker III') == 'kenneth walker'
+    assert crosswalk.normalize_name('José Ramírez-Smith Jr.') == 'jose ramirez smith'
+
+
+def test_best_match():
+    candidates = [('1', 'josh allen'), ('2', 'joshua allen'), ('3', 'keenan allen')]
+    assert crosswalk.best_match('keenan allen', candidates) == ('3', 'exact', 1.0)
+    assert crosswalk.best_match('keenan alen', candidates)[:2] == ('3', 'fuzzy')
+    assert crosswalk.best_match('nobody here', candidates) is None
+    # Two exact namesakes, or two fuzzy candidates inside the margin, are left unmatched.
+    assert crosswalk.best_match('josh allen', candidates + [('4', 'josh allen')]) is None
+    assert crosswalk.best_match('josh allenn', [('1', 'josh allen'), ('2', 'josh alleen')]) is None
+
+
+def _blocks(claimed=()):
+    # As load_espn_players leaves them: names normalized, positions grouped, teams aliased.
+    espn_players = {
+        '10': ('joshua allen', 'QB', 'BUF'),
+        '11': ('joshua allen', 'LB', 'JAX'),
+        '20': ('terry mclaurin', 'WR', 'WAS'),
+        '30': ('stefon diggs', 'WR', 'NE'),
+        '40': ('christian watson', None, 'GB'),
+    }
+    return crosswalk.build_blocks(espn_players, set(claimed))
+
+
+def test_players_match_inside_their_team_and_position_block():
+    by_team, by_name = _blocks()
+    matches = crosswalk.match_players([
+        ('s1', 'Josh Allen', 'QB', 'BUF', True),
+        ('s2', 'Josh Allen', 'OLB', 'JAC', True),
+        ('s3', 'Terry McLaurin', 'WR', 'WSH', True),
+        ('s4', 'Christian Watson', 'WR', 'GB', True),
+    ], by_team, by_name)
+    assert sorted(matches) == [
+        ('s1', '10', 'exact', 1.0),
+        ('s2', '11', 'exact', 1.0),
+        ('s3', '20', 'exact', 1.0),
+        ('s4', '40', 'exact', 1.0),
+    ]
+
+
+def test_a_traded_player_matches_by_name_anywhere_in_the_league():
+    by_team, by_name = _blocks()
+    assert crosswalk.match_players([('s5', 'Stefon Diggs', 'WR', 'HOU', True)], by_team, by_name) == [
+        ('s5', '30', 'exact', 1.0),
+    ]
+    # Not when the name is shared, and not for inactive players.
+    assert crosswalk.match_players([
+        ('s5', 'Stefon Diggs', 'WR', 'HOU', True),
+        ('s6', 'Stefon Diggs', 'WR', None, True),
+    ], by_team, by_name) == []
+    assert crosswalk.match_players([('s5', 'Stefon Diggs', 'WR', 'HOU', False)], by_team, by_name) == []
+
+
+def test_an_espn_id_is_given_once_and_never_when_claimed():
+    by_team, by_name = _blocks()
+    matches = crosswalk.match_players([
+        ('s7', 'Stefon Diggs', 'WR', None, True),
+        ('s8', 'Stefon Digs', 'WR', 'NE', True),
+    ], by_team, by_name)
+    assert [(sleeper_id, espn_id) for sleeper_id, espn_id, _, _ in matches] == [('s8', '30')]
+
+    by_team, by_name = _blocks(claimed={'30'})
+    assert crosswalk.match_players([('s8', 'Stefon Diggs', 'WR', 'NE', True)], by_team, by_name) == []
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+import pytest
+import database
+
+LATEST = database.MIGRATIONS[-1][0]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'fantasy.db')
+
+
+def _applied(conn):
+    return [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')]
+
+
+def test_migrations_are_numbered_in_order():
+    assert [number for number, _, _ in database.MIGRATIONS] == list(range(1, LATEST + 1))
+
+
+def test_a_new_database_is_migrated_to_the_latest_version(path, capsys):
+    conn = sqlite3.connect(path)
+    assert database.migrate(conn) == LATEST
+    assert _applied(conn) == list(range(1, LATEST + 1))
+    capsys.readouterr()
+
+    assert database.migrate(conn) == LATEST
+    assert capsys.readouterr().out == ''
+    assert _applied(conn) == list(range(1, LATEST + 1))
+
+
+def test_route_queries_do_not_scan_tables(path, capsys):
+    conn = sqlite3.connect(path)
+    database.migrate(conn)
+    assert database.explain(conn) == []
+
+
+def test_a_step_applied_by_another_process_is_skipped(path, monkeypatch, capsys):
+    conn = sqlite3.connect(path)
+    database.migrate(conn)
+    capsys.readouterr()
+
+    # A worker that read the version before another one migrated re-reads it under the lock.
+    monkeypatch.setattr(database, 'current_version', lambda conn: 0)
+    database.migrate(conn)
+    assert 'Applying migration' not in capsys.readouterr().out
+    assert _applied(conn) == list(range(1, LATEST + 1))
+
+
+def test_concurrent_workers_apply_each_migration_once(path):
+    errors = []
+
+    def worker():
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            database.migrate(conn)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert _applied(sqlite3.connect(path)) == list(range(1, LATEST + 1))
+
+
+def test_upgrading_dedupes_odds_before_adding_their_natural_keys(path, monkeypatch):
+    conn = sqlite3.connect(path)
+    monkeypatch.setattr(database, 'MIGRATIONS', [step for step in database.MIGRATIONS if step[0] < 16])
+    database.migrate(conn)
+
+    conn.executemany('INSERT INTO odds (odds_id, game_id, provider_id, details) VALUES (?, ?, ?, ?)',
+                     [(1, '401', '58', 'KC -3'), (2, '401', '58', 'KC -3.5'), (3, '402', '58', 'BUF -1')])
+    conn.executemany('INSERT INTO team_odds (team_odds_id, odds_id, team_id, moneyline) VALUES (?, ?, ?, ?)',
+                     [(1, 1, '12', -150), (2, 2, '12', -160), (3, 2, '12', -170), (4, 2, '2', 140)])
+    conn.commit()
+
+    monkeypatch.undo()
+    assert database.migrate(conn) == LATEST
+    assert conn.execute('SELECT odds_id, details FROM odds ORDER BY odds_id').fetchall() == [(2, 'KC -3.5'), (3, 'BUF -1')]
+    assert conn.execute('SELECT odds_id, team_id, moneyline FROM team_odds ORDER BY team_id').fetchall() == [
+        (2, '12', -170), (2, '2', 140),
+    ]
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO odds (game_id, provider_id) VALUES ('401', '58')")
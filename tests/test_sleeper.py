@@ -0,0 +1,40 @@
+import json
+import pytest
+import backend.sleeper as sleeper
+
+DUMP = {
+    '4046': {'full_name': 'Patrick Mahomes', 'team': 'KC', 'fantasy_positions': ['QB'], 'age': 30, 'active': True},
+    '6794': {'full_name': 'Justin Jefferson', 'injury_notes': 'Hamstring, "day-to-day" {listed}', 'weight': '195'},
+    '9999': {'full_name': 'Zoë Ångström', 'search_rank': 1.5e3, 'espn_id': None, 'news': []},
+    'KC': {'team': 'KC', 'position': 'DEF'},
+}
+
+
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1 << 16])
+def test_every_chunk_boundary_gives_the_same_players(size):
+    # Sizes 1 and 2 cut through keys, numbers, escapes and the multibyte characters.
+    data = json.dumps(DUMP, ensure_ascii=False, indent=1).encode()
+    assert list(sleeper.iter_object(_chunks(data, size))) == list(DUMP.items())
+
+
+def test_a_value_ending_at_a_chunk_boundary_is_not_decoded_early():
+    chunks = [b'{"1": 12', b'34, "2": tr', b'ue, "3": "a', b'b"}']
+    assert list(sleeper.iter_object(chunks)) == [('1', 1234), ('2', True), ('3', 'ab')]
+
+
+def test_empty_object_and_leading_whitespace():
+    assert list(sleeper.iter_object([b'  \n', b' {', b' }'])) == []
+
+
+def test_a_dump_that_is_not_an_object_is_rejected():
+    with pytest.raises(ValueError):
+        list(sleeper.iter_object([b'[1, 2]']))
+
+
+def test_a_truncated_dump_is_rejected():
+    with pytest.raises(ValueError):
+        list(sleeper.iter_object([b'{"1": {"full_name": "A"}, "2": {"full']))